@@ -1,24 +1,83 @@
 #!/usr/bin/env python
 # coding: utf-8
 
+import asyncio
+import csv
+import gc
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
 import os
-import re
-from datetime import datetime
-from typing import Any, Dict, Optional, List
+import sys
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from functools import partial
+from typing import Any, Dict, Iterator, Optional, List, Tuple
 
 import numpy as np
-import pandas as pd
 import uvicorn
-from fastapi import FastAPI, HTTPException, Body
+from fastapi import FastAPI, HTTPException, Body, File, Query, Request, UploadFile, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from scipy.interpolate import RegularGridInterpolator
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+
+from bunkering import (
+    BatchItemResult,
+    BunkeringRequest,
+    BunkeringResponse,
+    CalculationError,
+    TankInput,
+    bog_consumption,
+    build_bunkering_response,
+    calculate_bunkering_many,
+    iter_bunkering_results,
+    loaded_quantity,
+    operation_hours,
+    range_error_message,
+    reading_range_errors,
+    response_columns,
+    tank_fields,
+    tank_slots,
+    unflatten_record,
+)
+from engine import (
+    PinnedTables,
+    TableRegistry,
+    Vessel,
+    base_dir,
+    compute_quantities,
+    fleet,
+    get_tank_data_path,
+    ship_dir,
+    solve_level,
+    table_registry,
+    validate_tank,
+)
+from observability import Gauges, get_logger, metrics, process_memory, request_seconds, span
+from tables import TableError, scan_tables, tank_id_of
+
+logger = get_logger("api")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup.start()
+    data_watcher.start()
+    yield
+    data_watcher.stop()
+    calc_executor.shutdown()
 
 # FastAPI app
 app = FastAPI(
     title="LNG Bunkering Application API",
     description="REST API for LNG Bunkering Operations (no persistence)",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS
@@ -30,202 +89,456 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Directories
-base_dir = os.path.dirname(os.path.abspath(__file__))
-ship_dir = os.path.join(base_dir, "DATA")
-
-# Available ships configuration
-available_ships: Dict[str, List[str]] = {
-    "MOUNT TOURMALINE": ["LNG_TK1", "LNG_TK2"],
-    "MOUNT NOVATERRA": ["LNG_TK1", "LNG_TK2"],
-    "MOUNT ANETO": ["LNG_TK1", "LNG_TK2"],
-    "MOUNT TAI": ["LNG_TK1", "LNG_TK2"],
-    "MOUNT OSSA": ["LNG_TK1", "LNG_TK2"],
-    "MOUNT JADEITE": ["LNG_TK1", "LNG_TK2"],
-    "MOUNT API": ["LNG_TK1", "LNG_TK2"],
-    "MOUNT AMELIOR": ["LNG_TK1", "LNG_TK2"],
-    "MOUNT HENG": ["LNG_TK1", "LNG_TK2"],
-    "MOUNT GOWER": ["LNG_TK1", "LNG_TK2"],
-    "MOUNT GAEA": ["LNG_TK1", "LNG_TK2"],
-    "MOUNT COOK": ["LNG_TK1", "LNG_TK2"],
-    "MOUNT ARARAT": ["LNG_TK1", "LNG_TK2"],
-    "CMA CGM ARCTIC": ["LNG_TK"],
-    "CMA CGM BALI": ["LNG_TK"],
-    "CMA CGM DIGNITY": ["LNG_TK"],
-    "CMA CGM HOPE": ["LNG_TK"],
-    "CMA CGM IGUACU": ["LNG_TK"],
-    "CMA CGM INTEGRITY": ["LNG_TK"],
-    "CMA CGM LIBERTY": ["LNG_TK"],
-    "CMA CGM TENERE": ["LNG_TK"],
-    "CMA CGM PRIDE": ["LNG_TK"],
-    "CMA CGM SCANDOLA": ["LNG_TK"],
-    "CMA CGM SYMI": ["LNG_TK"],
-    "CMA CGM UNITY": ["LNG_TK"],
-    "ZIM ARIES": ["LNG_TANK"],
-    "ZIM GEMINI": ["LNG_TANK"],
-    "ZIM SCORPIO": ["LNG_TANK"],
-    "QUETZAL": ["LNGAS_TK"],
-    "COPAN": ["LNGAS_TK"],
-    "TISCAPA": ["LNGAS_TK"],
-    "TOROGOZ": ["LNGAS_TK"],
-    "CMA CGM DAYTONA": ["LNG_TK1", "LNG_TK2"],
-    "CMA CGM INDIANAPOLIS": ["LNG_TK1", "LNG_TK2"],
-    "CMA CGM MONACO": ["LNG_TK1", "LNG_TK2"],
-    "CMA CGM SILVERSTONE": ["LNG_TK1", "LNG_TK2"],
-    "CMA CGM MONZA": ["LNG_TK1", "LNG_TK2"],
-    "LAKE HERMAN": ["LNG_TK1", "LNG_TK2"],
-    "LAKE ANNECY": ["LNG_TK1", "LNG_TK2"],
-    "LAKE LUGU": ["LNG_TK1", "LNG_TK2"],
-    "LAKE QARAOUN": ["LNG_TK1", "LNG_TK2"],
-    "LAKE SAINT ANNE": ["LNG_TK1", "LNG_TK2"],
-    "LAKE TRAVIS": ["LNG_TK1", "LNG_TK2"],
-    "LAKE TAZAWA": ["LNG_TK1", "LNG_TK2"],
-    "ATLANTIC JADE": ["LNG_TK1", "LNG_TK2"],
-    "ATLANTIC EMERALD": ["LNG_TK1", "LNG_TK2"],
-    "STARWAY": ["LNG_TK1", "LNG_TK2"],
-    "GREENWAY": ["LNG_TK1", "LNG_TK2"],
-}
-
-# Tank flags (by family)
-lng_tanks = ["LNG_TK"]        # tanks needing only list/trim corrections
-lng_tks = ["LNG_TANK"]        # ZIM family: list/trim + volume
-LNG_TK_ALIAS = ["LNGAS_TK"]   # alias treated like lng_tanks
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    request_seconds.observe(
+        time.perf_counter() - started,
+        getattr(route, "path", "unmatched"),
+        request.method,
+        str(response.status_code),
+    )
+    return response
+
+@app.exception_handler(CalculationError)
+async def calculation_error_handler(request: Request, exc: CalculationError):
+    # Same body and status as the HTTPException it stands in for
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
 
 # Models
-class TankInput(BaseModel):
-    level: float = Field(..., description="Tank level in mm")
+class BatchBunkeringResponse(BaseModel):
+    count: int
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
+
+class Tolerances(BaseModel):
+    level: float = Field(0.0, ge=0, description="Level gauge error in mm")
+    vapor_temp: float = Field(0.0, ge=0, description="Vapor temperature error in °C")
+    liquid_temp: float = Field(0.0, ge=0, description="Liquid temperature error in °C")
+    pressure: float = Field(0.0, ge=0, description="Pressure error in Bar")
+    trim: float = Field(0.0, ge=0, description="Trim error in m")
+    list: float = Field(0.0, ge=0, description="List error in degrees")
+    density: float = Field(0.0, ge=0, description="Density error in kg/m3")
+
+class UncertaintyRequest(BunkeringRequest):
+    tolerances: Tolerances = Field(default_factory=Tolerances)
+    distribution: str = Field(
+        "normal", pattern="^(normal|uniform)$",
+        description="normal: tolerance is one standard deviation; uniform: tolerance is the half-width",
+    )
+    samples: int = Field(10000, ge=100, description="Monte Carlo samples")
+    confidence: float = Field(0.95, gt=0, lt=1, description="Confidence level of the intervals")
+    seed: Optional[int] = Field(None, description="Random seed, for reproducible results")
+    sensitivity: bool = Field(False, description="Also perturb each input on its own")
+
+class QuantityInterval(BaseModel):
+    nominal: float
+    mean: float
+    std: float
+    low: float
+    high: float
+
+class UncertaintyResponse(BaseModel):
+    ship_id: str
+    samples: int
+    valid_samples: int
+    distribution: str
+    confidence: float
+    loaded_quantity: QuantityInterval
+    difference: QuantityInterval
+    sensitivity: Optional[Dict[str, float]] = None
+
+class TankConditions(BaseModel):
     vapor_temp: float = Field(..., description="Vapor temperature in °C")
     liquid_temp: float = Field(..., description="Liquid temperature in °C")
     pressure: float = Field(..., description="Gauge pressure in Bar")
 
-class BunkeringRequest(BaseModel):
+class InverseRequest(BaseModel):
     ship_id: str = Field(..., description="Ship identifier")
     opening_tank1: TankInput
     opening_tank2: Optional[TankInput] = None
-    closing_tank1: TankInput
-    closing_tank2: Optional[TankInput] = None
-
     opening_trim: float = Field(..., description="Opening trim in m")
     opening_list: float = Field(..., description="Opening list in degrees")
-    closing_trim: float = Field(..., description="Closing trim in m")
-    closing_list: float = Field(..., description="Closing list in degrees")
-
-    opening_time: str = Field(..., description="Opening time (MM/DD/YYYY HH:MM)")
-    closing_time: str = Field(..., description="Closing time (MM/DD/YYYY HH:MM)")
+    closing_trim: float = Field(..., description="Expected closing trim in m")
+    closing_list: float = Field(..., description="Expected closing list in degrees")
+    closing_tank1: Optional[TankConditions] = Field(None, description="Expected closing conditions; defaults to opening")
+    closing_tank2: Optional[TankConditions] = None
 
+    opening_time: Optional[str] = Field(None, description="Opening time (MM/DD/YYYY HH:MM), for BOG")
+    closing_time: Optional[str] = Field(None, description="Planned closing time (MM/DD/YYYY HH:MM), for BOG")
     density: float = Field(..., description="Density in kg/m3")
-    bdn_quantity: float = Field(..., description="BDN quantity in m3")
-    bog: float = Field(..., description="Average BOG in kg/h")
-    gross_energy: float = Field(..., description="Gross energy in MMBtu or MWh")
-    unreckoned_qty: float = Field(..., description="Unreckoned quantity in m3")
-    net_energy: float = Field(..., description="Net energy in MMBtu or MWh")
-
-class BunkeringResponse(BaseModel):
+    bog: float = Field(0.0, description="Average BOG in kg/h")
+    unreckoned_qty: float = Field(0.0, description="Unreckoned quantity in m3")
+
+    target_quantity: Optional[float] = Field(None, description="Target loaded quantity in m3")
+    target_energy: Optional[float] = Field(None, description="Target energy in MMBtu or MWh (needs gross_energy and bdn_quantity)")
+    gross_energy: Optional[float] = Field(None, description="Gross energy of the BDN, same unit as target_energy")
+    bdn_quantity: Optional[float] = Field(None, description="BDN quantity in m3")
+
+class TankClosingLevel(BaseModel):
+    tank_id: str
+    capacity: float
+    share: float
+    opening_volume: float
+    closing_volume: float
+    closing_level: float
+    corrected_level: float
+    corrected_volume: float
+
+class InverseResponse(BaseModel):
     ship_id: str
-    tank1_volume_opening: float
-    tank2_volume_opening: Optional[float]
-    tank1_volume_closing: float
-    tank2_volume_closing: Optional[float]
+    target_quantity: float
+    achieved_quantity: float
     opening_quantity: float
     closing_quantity: float
-    volume_difference: float
     bog_consumption: float
-    loaded_quantity: float
-    net_quantity: float
-    difference: float
+    tanks: List[TankClosingLevel]
     calculation_time: str
 
-# Utilities
-def get_tank_data_path(ship_id: str, tank_id: str) -> Dict[str, str]:
-    ship_data_dir = os.path.join(ship_dir, ship_id)
-    if tank_id in lng_tanks or tank_id in LNG_TK_ALIAS:
-        return {
-            "list_table": os.path.join(ship_data_dir, f"list_table_{tank_id}.csv"),
-            "trim_table": os.path.join(ship_data_dir, f"trim_table_{tank_id}.csv"),
-        }
-    elif tank_id in lng_tks:
+class SnapshotTankInput(TankInput):
+    tank_id: str = Field(..., description="Tank identifier, as listed by /ships/{ship_id}")
+
+class SnapshotShipInput(BaseModel):
+    ship_id: str = Field(..., description="Ship identifier")
+    trim: float = Field(..., description="Current trim in m")
+    list: float = Field(..., description="Current list in degrees")
+    density: float = Field(..., description="Density in kg/m3")
+    tanks: List[SnapshotTankInput]
+
+class InventorySnapshotRequest(BaseModel):
+    ships: List[SnapshotShipInput]
+
+class TankInventory(BaseModel):
+    tank_id: str
+    status_code: int
+    error: Optional[str] = None
+    corrected_level: Optional[float] = None
+    corrected_volume: Optional[float] = None
+    liquid_volume: Optional[float] = None
+    vapour_volume: Optional[float] = None
+    total_volume: Optional[float] = None
+
+class ShipInventory(BaseModel):
+    ship_id: str
+    status_code: int
+    error: Optional[str] = None
+    total_volume: Optional[float] = None
+    tanks: List[TankInventory] = []
+
+class InventorySnapshotResponse(BaseModel):
+    ship_count: int
+    tank_count: int
+    failed: int
+    total_volume: float
+    snapshot_time: str
+    ships: List[ShipInventory]
+
+class LiveSessionStart(BaseModel):
+    ship_id: str = Field(..., description="Ship identifier")
+    density: float = Field(..., description="Density in kg/m3")
+    bog: float = Field(0.0, description="Average BOG in kg/h")
+    unreckoned_qty: float = Field(0.0, description="Unreckoned quantity in m3")
+
+class LiveReading(BaseModel):
+    time: datetime = Field(..., description="Reading time, ISO 8601 or epoch seconds")
+    trim: float = Field(..., description="Trim in m")
+    list: float = Field(..., description="List in degrees")
+    tank1: Optional[TankInput] = None
+    tank2: Optional[TankInput] = None
+
+# Ship metadata index
+table_names = ["list_table", "trim_table", "volume_table", "temp_table", "press_table"]
+optional_tables = ("volume_table", "temp_table", "press_table")
+
+class CachedJSON:
+    """A response body serialized once, with its validators."""
+
+    __slots__ = ("body", "etag", "modified_at", "last_modified")
+
+    def __init__(self, content: Any, modified_at: float):
+        self.body = json.dumps(content).encode()
+        self.etag = '"%s"' % hashlib.blake2b(self.body, digest_size=8).hexdigest()
+        self.modified_at = int(modified_at)
+        self.last_modified = formatdate(self.modified_at, usegmt=True)
+
+class MetadataIndex:
+    """Pre-serialized /ships, /ships/{id} and /debug/files/{id} bodies.
+
+    Built from one scan_tables() pass instead of per-request exists/getsize
+    calls, and rebuilt only when that scan differs (the DATA watcher passes
+    its own scan in) or the fleet manifest changes.
+    """
+
+    def __init__(self):
+        self.builds = 0
+        self._stamps: Optional[Dict[Tuple[str, str], Tuple[int, int]]] = None
+        self._entries: Dict[Tuple[str, str], CachedJSON] = {}
+        self._generation = 0
+        self._built_generation = -1
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, ship_id: str = "") -> Optional[CachedJSON]:
+        fleet.refresh()
+        if self._built_generation != self._generation:
+            self.refresh()
+        return self._entries.get((kind, ship_id))
+
+    def invalidate(self, *_) -> None:
+        self._generation += 1
+
+    def refresh(self, stamps: Optional[Dict[Tuple[str, str], Tuple[int, int]]] = None) -> bool:
+        if stamps is None:
+            stamps = scan_tables(ship_dir)
+        with self._lock:
+            generation = self._generation
+            if stamps == self._stamps and generation == self._built_generation:
+                return False
+            self._entries = self._build(stamps)
+            self._stamps = stamps
+            self._built_generation = generation
+            self.builds += 1
+        return True
+
+    def _build(self, stamps: Dict[Tuple[str, str], Tuple[int, int]]) -> Dict[Tuple[str, str], CachedJSON]:
+        latest: Dict[str, int] = {}
+        for (ship_id, _), (mtime_ns, _) in stamps.items():
+            latest[ship_id] = max(latest.get(ship_id, 0), mtime_ns)
+        fleet_time = fleet.modified_at
+        ship_ids = fleet.ship_ids()
+        entries = {("ships", ""): CachedJSON({"ships": ship_ids}, fleet_time)}
+        for ship_id in ship_ids:
+            tank_ids = fleet.tank_ids(ship_id) or []
+            modified_at = max(fleet_time, latest.get(ship_id, 0) / 1e9)
+            file_status: Dict[str, Any] = {}
+            debug_info: Dict[str, Any] = {}
+            for tank_id in tank_ids:
+                tank_paths = get_tank_data_path(ship_id, tank_id)
+                found = {k: stamps.get((ship_id, os.path.basename(p))) for k, p in tank_paths.items()}
+                # Optional tables a tank's family lacks are reported as None
+                file_status[tank_id] = {
+                    name: found.get(name) is not None if name in found or name not in optional_tables else None
+                    for name in table_names
+                }
+                debug_info[tank_id] = {
+                    "paths": tank_paths,
+                    "exists": {k: stamp is not None for k, stamp in found.items()},
+                    "file_size": {k: stamp[1] if stamp is not None else 0 for k, stamp in found.items()},
+                }
+            entries[("ship", ship_id)] = CachedJSON(
+                {"ship_id": ship_id, "tanks": tank_ids, "tank_count": len(tank_ids), "file_status": file_status},
+                modified_at,
+            )
+            entries[("files", ship_id)] = CachedJSON(
+                {"ship_id": ship_id, "base_dir": base_dir, "ship_dir": ship_dir, "debug_info": debug_info},
+                modified_at,
+            )
+        return entries
+
+metadata_index = MetadataIndex()
+fleet.on_change.append(metadata_index.invalidate)
+
+def cached_json_response(request: Request, entry: CachedJSON) -> Response:
+    """The cached body, or 304 when the client's ETag / Last-Modified still match."""
+    headers = {"ETag": entry.etag, "Last-Modified": entry.last_modified, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        if "*" in tags or entry.etag in tags or f"W/{entry.etag}" in tags:
+            return Response(status_code=304, headers=headers)
+    elif "if-modified-since" in request.headers:
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"]).timestamp()
+        except (TypeError, ValueError):
+            since = None
+        if since is not None and entry.modified_at <= since:
+            return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+# DATA directory watcher
+DATA_WATCH_INTERVAL = float(os.getenv("DATA_WATCH_INTERVAL", "2"))
+_MISSING = (-1, -1)
+
+class DataWatcher:
+    """Polls DATA/<ship>/ CSV mtimes and recompiles only the affected cached tanks.
+
+    A change is acted on once the file's stamp has been stable for one poll, so
+    a table that is still being copied is never loaded half-written. A reload
+    that fails validation is not retried until the files change again; the
+    failure is kept for /health/ready.
+    """
+
+    def __init__(self, registry: TableRegistry, interval: float = DATA_WATCH_INTERVAL):
+        self.registry = registry
+        self.interval = interval
+        self.reloads = 0
+        self.last_scan: Optional[float] = None
+        self.last_failure: Optional[Dict[str, Any]] = None
+        self._seen = scan_tables(ship_dir)
+        self._pending: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="data-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning("DATA watcher poll failed", extra={"error": str(e)})
+
+    def poll(self) -> List[Tuple[str, str]]:
+        current = scan_tables(ship_dir)
+        self.last_scan = time.time()
+        fleet.refresh()
+        metadata_index.refresh(current)
+
+        ready: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        for path in set(current) | set(self._seen):
+            stamp = current.get(path, _MISSING)
+            if stamp == self._seen.get(path, _MISSING):
+                self._pending.pop(path, None)
+                continue
+            if self._pending.get(path) != stamp:
+                self._pending[path] = stamp
+                continue
+            ship_id, filename = path
+            ready.setdefault((ship_id, tank_id_of(filename)), []).append(path)
+
+        reloaded: List[Tuple[str, str]] = []
+        for (ship_id, tank_id), paths in ready.items():
+            ok = self.registry.reload(ship_id, tank_id)
+            # Recorded either way: a failed version is retried once its files change again
+            for path in paths:
+                stamp = self._pending.pop(path)
+                if stamp == _MISSING:
+                    self._seen.pop(path, None)
+                else:
+                    self._seen[path] = stamp
+            if not ok:
+                self.last_failure = {
+                    "ship_id": ship_id,
+                    "tank_id": tank_id,
+                    "files": sorted(filename for _, filename in paths),
+                    "error": self.registry.reload_errors.get((ship_id, tank_id)),
+                    "at": datetime.now(timezone.utc).isoformat(),
+                }
+                continue
+            reloaded.append((ship_id, tank_id))
+        self.reloads += len(reloaded)
+        if reloaded:
+            logger.info("Reloaded calibration tables", extra={"tanks": reloaded})
+        return reloaded
+
+    def report(self) -> Dict[str, Any]:
         return {
-            "list_table": os.path.join(ship_data_dir, f"list_table_{tank_id}.csv"),
-            "trim_table": os.path.join(ship_data_dir, f"trim_table_{tank_id}.csv"),
-            "volume_table": os.path.join(ship_data_dir, f"volume_table_{tank_id}.csv"),
+            "interval": self.interval,
+            "reloads": self.reloads,
+            "last_scan": self.last_scan,
+            "failing": [f"{ship_id} {tank_id}" for ship_id, tank_id in self.registry.reload_errors],
+            "last_failure": self.last_failure,
         }
-    else:
+
+data_watcher = DataWatcher(table_registry)
+
+# Startup warm-up
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "0") == "1"
+WARMUP_WORKERS = int(os.getenv("WARMUP_WORKERS", "8"))
+
+class Warmup:
+    """Preloads every tank of the fleet in a thread pool and records per-ship load times.
+
+    Threads rather than processes: the compiled tables have to end up in this
+    process's registry, and table loading is mostly I/O and NumPy work that
+    releases the GIL.
+    """
+
+    def __init__(self, enabled: bool = WARMUP_ON_STARTUP, workers: int = WARMUP_WORKERS):
+        self.enabled = enabled
+        self.workers = workers
+        self.status = "pending" if enabled else "disabled"
+        self.started_at: Optional[float] = None
+        self.seconds: Optional[float] = None
+        self.ships: Dict[str, Dict[str, Any]] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status in ("done", "disabled")
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None or self.status == "done":
+            return
+        self._thread = threading.Thread(target=self.run, name="table-warmup", daemon=True)
+        self._thread.start()
+
+    def run(self) -> Dict[str, Dict[str, Any]]:
+        self.status = "running"
+        self.started_at = time.time()
+        started = time.perf_counter()
+        ship_ids = fleet.ship_ids()
+        if sum(len(fleet.tank_ids(s) or []) for s in ship_ids) > table_registry.maxsize:
+            logger.warning("Warm-up: fleet has more tanks than TABLE_CACHE_SIZE", extra={"maxsize": table_registry.maxsize})
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for ship_id, report in zip(ship_ids, pool.map(self._load_ship, ship_ids)):
+                self.ships[ship_id] = report
+        self.seconds = round(time.perf_counter() - started, 3)
+        failed = [s for s, r in self.ships.items() if r["errors"]]
+        self.status = "done"
+        logger.info("Warm-up finished", extra={"ships": len(self.ships), "seconds": self.seconds, "failed": failed})
+        return self.ships
+
+    @staticmethod
+    def _load_ship(ship_id: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        errors: Dict[str, str] = {}
+        for tank_id in fleet.tank_ids(ship_id) or []:
+            try:
+                tables = table_registry.get(ship_id, tank_id).load_all()
+                # Probe the middle of the level axis to prove the interpolators evaluate
+                level_axis = tables.table(tables.spec.level_table).x
+                probe = (float(level_axis[0]) + float(level_axis[-1])) / 2.0
+                _, volume = tables.correct_many([probe], [0.0], [0.0], [-160.0], [0.1])
+                if np.isnan(volume[0]):
+                    errors[tank_id] = f"probe at level {probe} did not evaluate"
+            except Exception as e:
+                errors[tank_id] = str(e)
+        return {"seconds": round(time.perf_counter() - started, 3), "errors": errors}
+
+    def report(self) -> Dict[str, Any]:
         return {
-            "volume_table": os.path.join(ship_data_dir, f"volume_table_{tank_id}.csv"),
-            "list_table": os.path.join(ship_data_dir, f"list_table_{tank_id}.csv"),
-            "trim_table": os.path.join(ship_data_dir, f"trim_table_{tank_id}.csv"),
-            "temp_table": os.path.join(ship_data_dir, f"temp_table_{tank_id}.csv"),
-            "press_table": os.path.join(ship_data_dir, f"press_table_{tank_id}.csv"),
+            "status": self.status,
+            "seconds": self.seconds,
+            "ships": self.ships,
         }
 
-def get_range_values(ship_id: str, tank_id: str):
-    tank_paths = get_tank_data_path(ship_id, tank_id)
-    if not all(os.path.exists(p) for p in tank_paths.values()):
-        raise HTTPException(
-            status_code=404,
-            detail=f"Missing data files for ship {ship_id} and tank {tank_id}",
-        )
+warmup = Warmup()
 
-    def extract_values(columns: List[str], prefix: str) -> List[float]:
-        vals: List[float] = []
-        for col in columns:
-            m = re.search(rf"{prefix}([-+]?\d*\.?\d+)", col)
-            if m:
-                vals.append(float(m.group(1)))
-        return vals
-
-    if tank_id in lng_tanks or tank_id in LNG_TK_ALIAS:
-        level_list_df = pd.read_csv(tank_paths["list_table"])
-        level_trim_df = pd.read_csv(tank_paths["trim_table"])
-        list_values = extract_values(list(level_list_df.columns[1:]), "list_")
-        trim_values = extract_values(list(level_trim_df.columns[1:]), "trim_")
-        level_min = float(level_trim_df["level"].min())
-        level_max = float(level_trim_df["level"].max())
-        list_min, list_max = (min(list_values), max(list_values)) if list_values else (None, None)
-        trim_min, trim_max = (min(trim_values), max(trim_values)) if trim_values else (None, None)
-        temp_min, temp_max = (-165.0 if tank_id in LNG_TK_ALIAS else -163.0), 20.0
-        press_min, press_max = 0.0, 0.7
-        return level_min, level_max, list_min, list_max, trim_min, trim_max, temp_min, temp_max, press_min, press_max
-
-    elif tank_id in lng_tks:
-        level_list_df = pd.read_csv(tank_paths["list_table"])
-        level_trim_df = pd.read_csv(tank_paths["trim_table"])
-        level_volume_df = pd.read_csv(tank_paths["volume_table"])
-        list_values = extract_values(list(level_list_df.columns[1:]), "list_")
-        trim_values = extract_values(list(level_trim_df.columns[1:]), "trim_")
-        level_min = float(level_volume_df["level"].min())
-        level_max = float(level_volume_df["level"].max())
-        list_min, list_max = (min(list_values), max(list_values)) if list_values else (None, None)
-        trim_min, trim_max = (min(trim_values), max(trim_values)) if trim_values else (None, None)
-        temp_min, temp_max = -163.0, 20.0
-        press_min, press_max = 0.0, 0.7
-        return level_min, level_max, list_min, list_max, trim_min, trim_max, temp_min, temp_max, press_min, press_max
-
-    else:
-        required = ["volume_table", "list_table", "trim_table", "temp_table", "press_table"]
-        if not all(k in tank_paths and os.path.exists(tank_paths[k]) for k in required):
-            raise HTTPException(status_code=404, detail=f"Missing required files for {ship_id} {tank_id}")
-        level_volume_df = pd.read_csv(tank_paths["volume_table"])
-        level_list_df = pd.read_csv(tank_paths["list_table"])
-        level_trim_df = pd.read_csv(tank_paths["trim_table"])
-        level_temp_df = pd.read_csv(tank_paths["temp_table"])
-        level_press_df = pd.read_csv(tank_paths["press_table"])
-
-        def ex(columns: List[str], prefix: str) -> List[float]:
-            return [float(col.replace(prefix, "")) for col in columns]
-
-        list_values = ex(list(level_list_df.columns[1:]), "list_")
-        trim_values = ex(list(level_trim_df.columns[1:]), "trim_")
-        temp_values = ex(list(level_temp_df.columns[1:]), "temp_")
-        press_values = ex(list(level_press_df.columns[1:]), "press_")
-
-        level_min = float(level_volume_df["level"].min())
-        level_max = float(level_volume_df["level"].max())
-        list_min, list_max = (min(list_values), max(list_values)) if list_values else (None, None)
-        trim_min, trim_max = (min(trim_values), max(trim_values)) if trim_values else (None, None)
-        temp_min, temp_max = (min(temp_values), max(temp_values)) if temp_values else (None, None)
-        press_min, press_max = (min(press_values), max(press_values)) if press_values else (None, None)
-        return level_min, level_max, list_min, list_max, trim_min, trim_max, temp_min, temp_max, press_min, press_max
+# Preload in the master: with `gunicorn --preload` (see gunicorn.conf.py) the
+# app module is imported once before forking, so loading every tank here lets
+# all workers share the compiled tables copy-on-write instead of each loading
+# its own. gc.freeze() keeps the collector from writing to those objects'
+# headers, which would otherwise un-share their pages.
+PRELOAD_TABLES = os.getenv("PRELOAD_TABLES", "0") == "1"
+
+if PRELOAD_TABLES:
+    warmup.enabled = True
+    warmup.run()
+    gc.freeze()
 
 def compute_corrected_values(
     ship_id: str,
@@ -237,191 +550,678 @@ def compute_corrected_values(
     press_: float,
 ):
     try:
-        print(
-            f"DEBUG: compute_corrected_values ship_id={ship_id}, tank_id={tank_id}, "
-            f"level={level}, list_={list_}, trim_={trim_}"
+        corrected_level, corrected_volume = Vessel(ship_id).tank(tank_id).correct(level, list_, trim_, temp_, press_)
+        logger.debug(
+            "compute_corrected_values %s %s level=%s list=%s trim=%s -> level=%s volume=%s",
+            ship_id, tank_id, level, list_, trim_, corrected_level, corrected_volume,
         )
-        tank_paths = get_tank_data_path(ship_id, tank_id)
-        if not tank_paths:
-            print(f"DEBUG: No tank paths found for {ship_id} - {tank_id}")
-            return None, None
-
-        if tank_id in lng_tanks or tank_id in LNG_TK_ALIAS:
-            level_list_df = pd.read_csv(tank_paths["list_table"])
-            level_trim_df = pd.read_csv(tank_paths["trim_table"])
-
-            level_values_1 = level_list_df["level"].values
-            level_values_2 = level_trim_df["level"].values
-            list_values = np.array([float(c.replace("list_", "")) for c in level_list_df.columns[1:]])
-            trim_values = np.array([float(c.replace("trim_", "")) for c in level_trim_df.columns[1:]])
-
-            level_list_interpolator = RegularGridInterpolator(
-                (level_values_1, list_values),
-                level_list_df.iloc[:, 1:].values,
-                method="linear",
-            )
-            level_trim_interpolator = RegularGridInterpolator(
-                (level_values_2, trim_values),
-                level_trim_df.iloc[:, 1:].values,
-                method="linear",
-            )
+        return corrected_level, corrected_volume
 
-            list_correction = float(level_list_interpolator([[level, list_]])[0])
-            corrected_level = level + list_correction
-            corrected_volume = float(level_trim_interpolator([[corrected_level, trim_]])[0])
+    except Exception as e:
+        # Out-of-range readings are rejected before this, so a failure here is a table fault
+        logger.warning(
+            "Interpolation failed",
+            extra={
+                "ship_id": ship_id, "tank_id": tank_id, "level": level,
+                "error_type": type(e).__name__, "error": str(e),
+            },
+        )
+        return None, None
+
+def get_ship_parameters(ship_id: str) -> Dict[str, Any]:
+    ship = fleet.ship(ship_id)
+    if ship is None:
+        raise HTTPException(status_code=400, detail=f"Unknown ship ID: {ship_id}")
+    return ship.parameters()
 
-            print(f"DEBUG: computed corrected_level={corrected_level}, corrected_volume={corrected_volume}")
-            return round(corrected_level, 2), round(corrected_volume, 2)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
 
-        elif tank_id in lng_tks:
-            level_list_df = pd.read_csv(tank_paths["list_table"])
-            level_trim_df = pd.read_csv(tank_paths["trim_table"])
-            level_volume_df = pd.read_csv(tank_paths["volume_table"])
+# Fleet inventory snapshot
+inventory_fields = ["corrected_level", "corrected_volume", "liquid_volume", "vapour_volume", "total_volume"]
 
-            level_values = level_volume_df["level"].values
-            volume_values = level_volume_df["volume"].values
-            list_values = np.array([float(c.replace("list_", "")) for c in level_list_df.columns[1:]])
-            trim_values = np.array([float(c.replace("trim_", "")) for c in level_trim_df.columns[1:]])
+def ship_inventory(ship: SnapshotShipInput) -> ShipInventory:
+    """Current quantities for the soundings of one ship, one vectorized call per tank.
 
-            level_list_interpolator = RegularGridInterpolator(
-                (level_values, list_values), level_list_df.iloc[:, 1:].values, method="linear"
+    Failures are per tank: unknown tank 400, readings outside the tables 422,
+    tables that fail to evaluate 500. The ship total sums the tanks that
+    succeeded. Tables that fail their integrity check fail the snapshot with
+    a 500 naming the problem, as in reading_range_errors.
+    """
+    try:
+        vessel = Vessel(ship.ship_id)
+    except KeyError:
+        tanks = [TankInventory(tank_id=t.tank_id, status_code=400, error="Invalid ship ID") for t in ship.tanks]
+        return ShipInventory(ship_id=ship.ship_id, status_code=400, error="Invalid ship ID", tanks=tanks)
+
+    results: List[Optional[TankInventory]] = [None] * len(ship.tanks)
+    groups: Dict[str, List[int]] = {}
+    for i, reading in enumerate(ship.tanks):
+        tank = vessel.tank(reading.tank_id)
+        if tank is None:
+            results[i] = TankInventory(tank_id=reading.tank_id, status_code=400, error="Invalid tank ID")
+            continue
+        readings = {field: getattr(reading, field) for field in tank_fields}
+        readings.update(list=ship.list, trim=ship.trim)
+        try:
+            errors = tank.out_of_range(readings)
+        except TableError as e:
+            raise CalculationError(500, str(e))
+        if errors:
+            for error in errors:
+                error["tank"] = reading.tank_id
+            results[i] = TankInventory(tank_id=reading.tank_id, status_code=422, error=range_error_message(errors))
+            continue
+        groups.setdefault(reading.tank_id, []).append(i)
+
+    for tank_id, rows in groups.items():
+        readings = [ship.tanks[i] for i in rows]
+        try:
+            quantities = compute_quantities(
+                vessel.tank(tank_id),
+                [r.level for r in readings],
+                ship.list,
+                ship.trim,
+                [r.vapor_temp for r in readings],
+                [r.liquid_temp for r in readings],
+                [r.pressure for r in readings],
+                ship.density,
             )
-            level_trim_interpolator = RegularGridInterpolator(
-                (level_values, trim_values), level_trim_df.iloc[:, 1:].values, method="linear"
+        except Exception as e:
+            logger.debug("Inventory for %s %s failed: %s", ship.ship_id, tank_id, e)
+            quantities = None
+        for j, i in enumerate(rows):
+            values = {field: float(quantities[field][j]) for field in inventory_fields} if quantities else {}
+            if not values or any(np.isnan(v) for v in values.values()):
+                results[i] = TankInventory(
+                    tank_id=tank_id, status_code=500, error="Failed to compute corrected values"
+                )
+                continue
+            results[i] = TankInventory(
+                tank_id=tank_id, status_code=200, **{field: round(v, 2) for field, v in values.items()}
             )
-            level_volume_interpolator = RegularGridInterpolator(
-                (level_values,), volume_values, method="linear"
+
+    total = sum(t.total_volume for t in results if t.status_code == 200)
+    return ShipInventory(ship_id=ship.ship_id, status_code=200, total_volume=round(total, 2), tanks=results)
+
+def ship_inventories(ships: List[SnapshotShipInput]) -> List[ShipInventory]:
+    return [ship_inventory(ship) for ship in ships]
+
+# Live gauging (WebSocket)
+class LiveSession:
+    """Rolling loaded quantity of one ship from a stream of timestamped gauge readings.
+
+    Each tank keeps the total volume of its latest reading. The first combined
+    quantity once every tank has reported is the opening; every reading after
+    that gives the loaded quantity so far with loaded_quantity, as in
+    build_bunkering_response: volume difference, plus BOG consumed since the
+    opening, plus the unreckoned quantity.
+    """
+
+    def __init__(self, start: LiveSessionStart):
+        self.start = start
+        self.vessel = Vessel(start.ship_id)
+        self.totals: List[Optional[float]] = [None] * len(self.vessel.tanks)
+        self.opening_time: Optional[datetime] = None
+        self.opening_quantity = 0.0
+        self.last_time: Optional[datetime] = None
+        self.last_loaded: Optional[Tuple[float, float]] = None
+
+    def warm(self) -> None:
+        # The session keeps the tables it was warmed with, so its opening and
+        # later readings never straddle a reload
+        ship_id = self.vessel.ship_id
+        tables = {(ship_id, tank.tank_id): tank.tables.load_all() for tank in self.vessel.tanks}
+        self.vessel = Vessel(ship_id, registry=PinnedTables(tables, table_registry.results))
+
+    def update(self, reading: LiveReading) -> Dict[str, Any]:
+        time_ = reading.time
+        if time_.tzinfo is not None:
+            time_ = time_.astimezone(timezone.utc).replace(tzinfo=None)
+        if self.last_time is not None and time_ < self.last_time:
+            raise HTTPException(status_code=400, detail="Reading time is before the previous reading")
+        tank_readings = [(p, r) for p, r in enumerate((reading.tank1, reading.tank2)) if r is not None]
+        if not tank_readings:
+            raise HTTPException(status_code=400, detail="Reading has no tank values")
+
+        # All tanks of the reading are checked before any is applied
+        errors: List[Dict[str, Any]] = []
+        for position, values in tank_readings:
+            if position >= len(self.vessel.tanks):
+                raise HTTPException(status_code=400, detail=f"Ship has no tank {position + 1}")
+            readings = {field: getattr(values, field) for field in tank_fields}
+            readings.update(list=reading.list, trim=reading.trim)
+            for error in self.vessel.tanks[position].out_of_range(readings):
+                if error["field"] not in ("list", "trim"):
+                    error["field"] = f"tank{position + 1}.{error['field']}"
+                error["tank"] = f"tank {position + 1}"
+                errors.append(error)
+        if errors:
+            raise HTTPException(status_code=422, detail={"message": range_error_message(errors), "errors": errors})
+
+        totals = list(self.totals)
+        for position, values in tank_readings:
+            tank = self.vessel.tanks[position]
+            try:
+                _, corrected_volume = tank.correct(
+                    values.level, reading.list, reading.trim, values.vapor_temp, values.pressure
+                )
+            except Exception:
+                raise HTTPException(
+                    status_code=500, detail=f"Failed to compute corrected values for tank {position + 1}"
+                )
+            totals[position] = tank.total_volume(
+                corrected_volume, values.liquid_temp, values.vapor_temp, values.pressure, self.start.density
             )
+        self.totals = totals
+        self.last_time = time_
+
+        result: Dict[str, Any] = {"type": "reading", "time": reading.time.isoformat()}
+        for position, total in enumerate(totals):
+            result[f"tank{position + 1}_volume"] = round(total, 2) if total is not None else None
+        if any(total is None for total in totals):
+            # Opening not established until every tank has reported
+            return result
+        quantity = sum(totals)
+        if self.opening_time is None:
+            self.opening_time, self.opening_quantity = time_, quantity
+        hours = (time_ - self.opening_time).total_seconds() / 3600.0
+        vol_diff = quantity - self.opening_quantity
+        bog_cons = bog_consumption(self.start.bog, hours, self.start.density)
+        loaded_qty = loaded_quantity(vol_diff, self.start.bog, hours, self.start.density, self.start.unreckoned_qty)
+        rate = None
+        if self.last_loaded is not None and hours > self.last_loaded[0]:
+            rate = (loaded_qty - self.last_loaded[1]) / (hours - self.last_loaded[0])
+        self.last_loaded = (hours, loaded_qty)
+        result.update(
+            elapsed_hours=round(hours, 4),
+            opening_quantity=round(self.opening_quantity, 2),
+            quantity=round(quantity, 2),
+            volume_difference=round(vol_diff, 2),
+            bog_consumption=round(bog_cons, 2),
+            loaded_quantity=round(loaded_qty, 2),
+            loading_rate=round(rate, 2) if rate is not None else None,
+        )
+        return result
+
+def live_error(status_code: int, detail: Any) -> Dict[str, Any]:
+    return {"type": "error", "status_code": status_code, "error": detail}
+
+# Streaming bulk calculation (NDJSON/CSV upload -> NDJSON/CSV rows)
+def iter_upload_records(upload: UploadFile, input_format: str) -> Iterator[Any]:
+    text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    if input_format == "csv":
+        for row in csv.DictReader(text):
+            yield unflatten_record(row)
+        return
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield CalculationError(422, f"Invalid JSON: {str(e)}")
+
+def format_ndjson(results: Iterator[BatchItemResult]) -> Iterator[str]:
+    for item in results:
+        yield item.model_dump_json() + "\n"
+
+def format_csv(results: Iterator[BatchItemResult]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=response_columns)
+    writer.writeheader()
+    for item in results:
+        row = {"index": item.index, "status_code": item.status_code, "error": item.error or ""}
+        if item.result is not None:
+            row.update(item.result.model_dump())
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+# Calculation executor
+CALC_EXECUTOR = os.getenv("CALC_EXECUTOR", "thread")   # "thread" or "process"
+CALC_WORKERS = int(os.getenv("CALC_WORKERS", "4"))
+CALC_MAX_PENDING = int(os.getenv("CALC_MAX_PENDING", "64"))
+
+_worker_generation: Optional[int] = None
+
+def _run_in_worker(generation: int, fn, *args):
+    # Process workers only. A new table generation means the parent reloaded
+    # tables or the fleet manifest since this worker's last job, so the
+    # worker's own copies are dropped first
+    global _worker_generation
+    if generation != _worker_generation:
+        if _worker_generation is not None:
+            fleet.reload()
+            table_registry.clear()
+        _worker_generation = generation
+    # An HTTPException raised by api code crosses the pool as CalculationError
+    try:
+        return fn(*args)
+    except HTTPException as e:
+        raise CalculationError(e.status_code, e.detail)
+
+class CalculationExecutor:
+    """Runs blocking calculation work off the event loop with bounded concurrency.
+
+    At most ``workers`` calculations run at once and at most ``max_pending``
+    are accepted (running plus queued); beyond that callers get a 503 with the
+    current queue depth instead of piling up behind the pool.
+    """
+
+    def __init__(self, kind: str = CALC_EXECUTOR, workers: int = CALC_WORKERS, max_pending: int = CALC_MAX_PENDING):
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max(max_pending, workers)
+        self.in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._pool: Optional[Executor] = None
+
+    @property
+    def pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                # Each worker process keeps its own table registry, dropped when
+                # table_registry.generation moves (see _run_in_worker). Workers
+                # are not forked: the pool starts after the data watcher thread,
+                # and a fork taken while it holds a lock can deadlock
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="calc")
+        return self._pool
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail={
+                        "message": "Calculation queue is full, retry later",
+                        "in_flight": self.in_flight,
+                        "queued": self.in_flight - self.workers,
+                        "max_pending": self.max_pending,
+                    },
+                    headers={"Retry-After": "1"},
+                )
+            self.in_flight += 1
+        try:
+            if self.kind == "process":
+                fn, args = _run_in_worker, (table_registry.generation, fn) + args
+            return await asyncio.get_running_loop().run_in_executor(self.pool, partial(fn, *args))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queued": max(self.in_flight - self.workers, 0),
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+        }
 
-            list_correction = float(level_list_interpolator([[level, list_]])[0])
-            trim_correction = float(level_trim_interpolator([[level, trim_]])[0])
-            corrected_level = level + list_correction + trim_correction
-            corrected_volume = float(level_volume_interpolator([[corrected_level]])[0])
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
 
-            print(f"DEBUG: computed corrected_level={corrected_level}, corrected_volume={corrected_volume}")
-            return round(corrected_level, 2), round(corrected_volume, 2)
+calc_executor = CalculationExecutor()
 
-        else:
-            level_volume_df = pd.read_csv(tank_paths["volume_table"])
-            level_list_df = pd.read_csv(tank_paths["list_table"])
-            level_trim_df = pd.read_csv(tank_paths["trim_table"])
-            level_temp_df = pd.read_csv(tank_paths["temp_table"])
-            level_press_df = pd.read_csv(tank_paths["press_table"])
-
-            level_values = level_volume_df["level"].values
-            volume_values = level_volume_df["volume"].values
-            list_values = np.array([float(c.replace("list_", "")) for c in level_list_df.columns[1:]])
-            trim_values = np.array([float(c.replace("trim_", "")) for c in level_trim_df.columns[1:]])
-            temp_values = np.array([float(c.replace("temp_", "")) for c in level_temp_df.columns[1:]])
-            press_values = np.array([float(c.replace("press_", "")) for c in level_press_df.columns[1:]])
-
-            level_list_interpolator = RegularGridInterpolator(
-                (level_values, list_values), level_list_df.iloc[:, 1:].values, method="linear"
-            )
-            level_trim_interpolator = RegularGridInterpolator(
-                (level_values, trim_values), level_trim_df.iloc[:, 1:].values, method="linear"
-            )
-            level_temp_interpolator = RegularGridInterpolator(
-                (level_values, temp_values), level_temp_df.iloc[:, 1:].values, method="linear"
-            )
-            level_press_interpolator = RegularGridInterpolator(
-                (level_values, press_values), level_press_df.iloc[:, 1:].values, method="linear"
-            )
-            level_volume_interpolator = RegularGridInterpolator(
-                (level_values,), volume_values, method="linear"
-            )
+metrics.register(Gauges("bunkering_table_cache", "Calibration table cache statistics.", table_registry.stats))
+metrics.register(Gauges("bunkering_result_cache", "Corrected-value memoization statistics.", table_registry.results.stats))
+metrics.register(Gauges("bunkering_process_memory_bytes", "Resident memory of this worker (rss, pss, shared, private).", process_memory))
+metrics.register(Gauges("bunkering_calc_executor", "Calculation executor queue statistics.", calc_executor.stats))
 
-            list_correction = float(level_list_interpolator([[level, list_]])[0])
-            trim_correction = float(level_trim_interpolator([[level, trim_]])[0])
-            temp_correction = float(level_temp_interpolator([[level, temp_]])[0])
-            press_correction = float(level_press_interpolator([[level, press_]])[0])
+def run_bunkering_calculation(request: BunkeringRequest) -> BunkeringResponse:
+    range_errors = reading_range_errors(request)
+    if range_errors:
+        raise HTTPException(
+            status_code=422,
+            detail={"message": range_error_message(range_errors), "errors": range_errors},
+        )
+    try:
+        tank_ids = fleet.tank_ids(request.ship_id)
+        if tank_ids is None:
+            raise HTTPException(status_code=400, detail="Invalid ship ID")
 
-            corrected_level = level + list_correction + trim_correction + temp_correction + press_correction
-            corrected_volume = float(level_volume_interpolator([[corrected_level]])[0])
+        vessel = Vessel(request.ship_id)
+        difference_in_hours = operation_hours(request)
+        logger.debug("Calculation for %s, tanks %s, %s hours", request.ship_id, tank_ids, difference_in_hours)
+
+        # Opening/closing x tank 1/tank 2; a tank 2 that fails to compute counts as 0
+        total_volumes: List[float] = []
+        for label, position, attr, phase in tank_slots:
+            reading = getattr(request, attr)
+            if position >= len(vessel.tanks) or reading is None:
+                total_volumes.append(0.0)
+                continue
+            tank = vessel.tanks[position]
+            corrected_level, corrected_volume = compute_corrected_values(
+                request.ship_id,
+                tank.tank_id,
+                reading.level,
+                getattr(request, f"{phase}_list"),
+                getattr(request, f"{phase}_trim"),
+                reading.vapor_temp,
+                reading.pressure,
+            )
+            if corrected_level is None or corrected_volume is None:
+                if position == 0:
+                    raise HTTPException(status_code=500, detail=f"Failed to compute corrected values for {label}")
+                total_volumes.append(0.0)
+                continue
+            total_volumes.append(tank.total_volume(
+                corrected_volume, reading.liquid_temp, reading.vapor_temp, reading.pressure, request.density
+            ))
+
+        logger.debug("Tank totals for %s: %s", request.ship_id, total_volumes)
+        with span("response", request.ship_id):
+            return build_bunkering_response(request, tank_ids, *total_volumes, difference_in_hours)
+
+    except (HTTPException, CalculationError):
+        # Already carries its status (400 for an unknown ship, as in the batch path)
+        raise
+    except Exception as e:
+        # Traceback only when DEBUG is on; the message alone at WARNING
+        logger.warning(
+            "Calculation failed",
+            extra={"ship_id": request.ship_id, "error_type": type(e).__name__, "error": str(e)},
+            exc_info=logger.isEnabledFor(logging.DEBUG),
+        )
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
 
-            print(f"DEBUG: computed corrected_level={corrected_level}, corrected_volume={corrected_volume}")
-            return round(corrected_level, 2), round(corrected_volume, 2)
+# Monte Carlo uncertainty
+UNCERTAINTY_MAX_SAMPLES = int(os.getenv("UNCERTAINTY_MAX_SAMPLES", "100000"))
+
+uncertainty_inputs = list(Tolerances.model_fields)
+
+def sample_noise(request: UncertaintyRequest, rng: np.random.Generator) -> Dict[Tuple[str, ...], np.ndarray]:
+    """Unit errors per independent gauge: each tank reading, each phase's trim/list, the density."""
+    n = request.samples
+    draw = rng.standard_normal if request.distribution == "normal" else (lambda size: rng.uniform(-1.0, 1.0, size))
+    noise: Dict[Tuple[str, ...], np.ndarray] = {("density",): draw(n)}
+    for phase in ("opening", "closing"):
+        noise[(phase, "trim")] = draw(n)
+        noise[(phase, "list")] = draw(n)
+    for _, _, attr, _ in tank_slots:
+        for field in tank_fields:
+            noise[(attr, field)] = draw(n)
+    return noise
+
+def sample_quantities(
+    request: UncertaintyRequest,
+    vessel: Vessel,
+    hours: float,
+    noise: Dict[Tuple[str, ...], np.ndarray],
+    active: List[str],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """loaded_quantity and difference per sample, with only the ``active`` inputs perturbed.
+
+    Vectorized build_bunkering_response: one compute_quantities call per tank
+    slot over all samples. Samples falling outside the tables come back NaN.
+    """
+    tolerances = request.tolerances
+
+    def value(name: str, nominal: float, key: Tuple[str, ...]) -> np.ndarray:
+        if name not in active:
+            return np.full(request.samples, nominal)
+        return nominal + getattr(tolerances, name) * noise[key]
+
+    density = value("density", request.density, ("density",))
+    totals: List[Any] = []
+    for _, position, attr, phase in tank_slots:
+        reading = getattr(request, attr)
+        if position >= len(vessel.tanks) or reading is None:
+            totals.append(0.0)
+            continue
+        quantities = compute_quantities(
+            vessel.tanks[position],
+            value("level", reading.level, (attr, "level")),
+            value("list", getattr(request, f"{phase}_list"), (phase, "list")),
+            value("trim", getattr(request, f"{phase}_trim"), (phase, "trim")),
+            value("vapor_temp", reading.vapor_temp, (attr, "vapor_temp")),
+            value("liquid_temp", reading.liquid_temp, (attr, "liquid_temp")),
+            value("pressure", reading.pressure, (attr, "pressure")),
+            density,
+        )
+        totals.append(quantities["total_volume"])
+
+    total_volume1, total_volume2, total_volume3, total_volume4 = totals
+    vol_diff = (total_volume3 + total_volume4) - (total_volume1 + total_volume2)
+    total_loaded_qty = loaded_quantity(vol_diff, request.bog, hours, density, request.unreckoned_qty)
+    net_qty = request.net_energy / (request.gross_energy / request.bdn_quantity)
+    return total_loaded_qty, total_loaded_qty - net_qty
+
+def quantity_interval(nominal: float, samples: np.ndarray, confidence: float) -> QuantityInterval:
+    low, high = np.quantile(samples, [(1 - confidence) / 2, (1 + confidence) / 2])
+    return QuantityInterval(
+        nominal=nominal,
+        mean=round(float(samples.mean()), 3),
+        std=round(float(samples.std()), 3),
+        low=round(float(low), 3),
+        high=round(float(high), 3),
+    )
 
-    except Exception as e:
-        print(f"DEBUG: Error in compute_corrected_values: {str(e)}")
-        return None, None
+def run_uncertainty_analysis(request: UncertaintyRequest) -> UncertaintyResponse:
+    if request.samples > UNCERTAINTY_MAX_SAMPLES:
+        raise HTTPException(status_code=400, detail=f"samples exceeds {UNCERTAINTY_MAX_SAMPLES}")
+    # The unperturbed result; also validates ship, times and reading ranges
+    nominal = run_bunkering_calculation(request)
+    vessel = Vessel(request.ship_id)
+    hours = operation_hours(request)
+    noise = sample_noise(request, np.random.default_rng(request.seed))
+    perturbed = [name for name in uncertainty_inputs if getattr(request.tolerances, name) > 0]
+
+    with span("uncertainty", request.ship_id):
+        loaded, difference = sample_quantities(request, vessel, hours, noise, perturbed)
+    valid = ~np.isnan(loaded)
+    if not valid.any():
+        raise HTTPException(status_code=422, detail="Every perturbed sample falls outside the calibration tables")
+
+    sensitivity = None
+    if request.sensitivity:
+        # Standard deviation of loaded_quantity with only that input perturbed
+        sensitivity = {}
+        for name in perturbed:
+            alone, _ = sample_quantities(request, vessel, hours, noise, [name])
+            sensitivity[name] = round(float(np.nanstd(alone)), 3)
+
+    return UncertaintyResponse(
+        ship_id=request.ship_id,
+        samples=request.samples,
+        valid_samples=int(valid.sum()),
+        distribution=request.distribution,
+        confidence=request.confidence,
+        loaded_quantity=quantity_interval(nominal.loaded_quantity, loaded[valid], request.confidence),
+        difference=quantity_interval(nominal.difference, difference[valid], request.confidence),
+        sensitivity=sensitivity,
+    )
 
-def get_ship_parameters(ship_id: str) -> Dict[str, Any]:
-    if ship_id in ["MOUNT TOURMALINE", "MOUNT NOVATERRA"]:
-        return {"BOG_max": 500, "LNG_TK1_cap": 3175.139, "LNG_TK2_cap": 3180.121, "identity": "209k_bulk"}
-    elif ship_id in [
-        "MOUNT ANETO", "MOUNT TAI", "MOUNT OSSA", "MOUNT JADEITE", "MOUNT API",
-        "MOUNT AMELIOR", "MOUNT HENG", "MOUNT GOWER", "MOUNT GAEA",
-        "MOUNT COOK", "MOUNT ARARAT"
-    ]:
-        return {"BOG_max": 500, "LNG_TK1_cap": 3181.546, "LNG_TK2_cap": 3179.732, "identity": "210k_bulk"}
-    elif ship_id in [
-        "CMA CGM ARCTIC", "CMA CGM BALI", "CMA CGM DIGNITY", "CMA CGM HOPE",
-        "CMA CGM IGUACU", "CMA CGM INTEGRITY", "CMA CGM LIBERTY", "CMA CGM PRIDE",
-        "CMA CGM TENERE", "CMA CGM SCANDOLA", "CMA CGM SYMI", "CMA CGM UNITY"
-    ]:
-        return {"BOG_max": 500, "LNG_TK1_cap": 12448.3, "identity": "CMA_cont"}
-    elif ship_id in ["ZIM ARIES", "ZIM GEMINI", "ZIM SCORPIO"]:
-        return {"BOG_max": 1200, "LNG_TK1_cap": 6125.285, "identity": "ZIM_cont"}
-    elif ship_id in [
-        "CMA CGM DAYTONA", "CMA CGM INDIANAPOLIS", "CMA CGM MONACO", "CMA CGM SILVERSTONE",
-        "CMA CGM MONZA", "LAKE HERMAN", "LAKE ANNECY", "LAKE LUGU", "LAKE QARAOUN",
-        "LAKE SAINT ANNE", "LAKE TRAVIS", "LAKE TAZAWA"
-    ]:
-        return {"BOG_max": 600, "LNG_TK1_cap": 2013.699, "LNG_TK2_cap": 2014.748, "identity": "PCTC"}
-    elif ship_id in ["ATLANTIC JADE", "ATLANTIC EMERALD"]:
-        return {"BOG_max": 1200, "LNG_TK1_cap": 2324.113, "LNG_TK2_cap": 2322.097, "identity": "110k_tanker"}
-    elif ship_id in ["STARWAY", "GREENWAY"]:
-        return {"BOG_max": 1200, "LNG_TK1_cap": 2570.133, "LNG_TK2_cap": 2571.517, "identity": "150k_tanker"}
-    elif ship_id in ["QUETZAL", "COPAN", "TISCAPA", "TOROGOZ"]:
-        return {"BOG_max": 500, "LNG_TK1_cap": 1613, "identity": "1400TEU_cont"}
-    else:
-        raise HTTPException(status_code=400, detail=f"Unknown ship ID: {ship_id}")
+def target_quantity(request: InverseRequest) -> float:
+    if (request.target_quantity is None) == (request.target_energy is None):
+        raise HTTPException(status_code=400, detail="Give exactly one of target_quantity or target_energy")
+    if request.target_quantity is not None:
+        return request.target_quantity
+    if not request.gross_energy or not request.bdn_quantity:
+        raise HTTPException(status_code=400, detail="target_energy needs gross_energy and bdn_quantity")
+    # Same energy-per-m3 as net_quantity in build_bunkering_response
+    return request.target_energy / (request.gross_energy / request.bdn_quantity)
+
+def run_inverse_calculation(request: InverseRequest) -> InverseResponse:
+    """Closing soundings that load ``target`` m3, split over the tanks by capacity.
+
+    loaded = closing - opening + BOG + unreckoned (loaded_quantity, as in
+    build_bunkering_response); each tank's share of the volume change is its
+    capacity over the total.
+    """
+    try:
+        vessel = Vessel(request.ship_id)
+    except KeyError:
+        raise HTTPException(status_code=400, detail="Invalid ship ID")
+    target = target_quantity(request)
+    hours = operation_hours(request) if request.opening_time and request.closing_time else 0.0
+    bog_cons = bog_consumption(request.bog, hours, request.density)
+
+    slots = []
+    errors: List[Dict[str, Any]] = []
+    for position, tank in enumerate(vessel.tanks[:2]):
+        opening = getattr(request, f"opening_tank{position + 1}")
+        if opening is None:
+            continue
+        closing = getattr(request, f"closing_tank{position + 1}") or opening
+        checks = [
+            ("opening", {field: getattr(opening, field) for field in tank_fields}),
+            ("closing", {field: getattr(closing, field) for field in tank_fields[1:]}),
+        ]
+        for phase, readings in checks:
+            readings.update(list=getattr(request, f"{phase}_list"), trim=getattr(request, f"{phase}_trim"))
+            for error in tank.out_of_range(readings):
+                field = error["field"]
+                error["field"] = f"{phase}_{field}" if field in ("list", "trim") else f"{phase}_tank{position + 1}.{field}"
+                error["tank"] = f"{phase} tank {position + 1}"
+                errors.append(error)
+        slots.append((tank, opening, closing))
+    if errors:
+        raise HTTPException(status_code=422, detail={"message": range_error_message(errors), "errors": errors})
+
+    opening_totals = []
+    for tank, opening, _ in slots:
+        _, corrected_volume = tank.correct(
+            opening.level, request.opening_list, request.opening_trim, opening.vapor_temp, opening.pressure
+        )
+        opening_totals.append(tank.total_volume(
+            corrected_volume, opening.liquid_temp, opening.vapor_temp, opening.pressure, request.density
+        ))
+
+    change = target - bog_cons - request.unreckoned_qty
+    capacity = sum(tank.capacity for tank, _, _ in slots)
+    results: List[TankClosingLevel] = []
+    closing_totals = []
+    for (tank, _, closing), opening_total in zip(slots, opening_totals):
+        share = tank.capacity / capacity
+        conditions = (request.closing_list, request.closing_trim, closing.vapor_temp, closing.pressure)
+        try:
+            with span("inverse", vessel.ship_id, tank.spec.family):
+                level = solve_level(
+                    tank, opening_total + change * share,
+                    request.closing_list, request.closing_trim,
+                    closing.vapor_temp, closing.liquid_temp, closing.pressure, request.density,
+                )
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        # Report what the forward calculation gives at the rounded sounding
+        level = round(level, 2)
+        corrected_level, corrected_volume = tank.correct(level, *conditions)
+        closing_total = tank.total_volume(
+            corrected_volume, closing.liquid_temp, closing.vapor_temp, closing.pressure, request.density
+        )
+        closing_totals.append(closing_total)
+        results.append(TankClosingLevel(
+            tank_id=tank.tank_id,
+            capacity=tank.capacity,
+            share=round(share, 4),
+            opening_volume=round(opening_total, 2),
+            closing_volume=round(closing_total, 2),
+            closing_level=level,
+            corrected_level=corrected_level,
+            corrected_volume=corrected_volume,
+        ))
+
+    opening_qty, closing_qty = sum(opening_totals), sum(closing_totals)
+    return InverseResponse(
+        ship_id=request.ship_id,
+        target_quantity=round(target, 2),
+        achieved_quantity=round(loaded_quantity(
+            closing_qty - opening_qty, request.bog, hours, request.density, request.unreckoned_qty
+        ), 2),
+        opening_quantity=round(opening_qty, 2),
+        closing_quantity=round(closing_qty, 2),
+        bog_consumption=round(bog_cons, 2),
+        tanks=results,
+        calculation_time=datetime.now().isoformat(),
+    )
 
 # Endpoints
 @app.get("/")
 async def root():
     return {"message": "LNG Bunkering Application API", "version": "1.0.0", "persistence": "none"}
 
+@app.get("/health/live")
+async def liveness():
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+async def readiness():
+    report = warmup.report()
+    report["tables"] = table_registry.stats()
+    report["results"] = table_registry.results.stats()
+    report["memory"] = dict(process_memory(), pid=os.getpid())
+    report["executor"] = calc_executor.stats()
+    report["data_watcher"] = data_watcher.report()
+    if not warmup.ready:
+        return JSONResponse(status_code=503, content=report)
+    return report
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/ships")
-async def get_ships():
-    return {"ships": list(available_ships.keys())}
+def get_ships(request: Request):
+    return cached_json_response(request, metadata_index.get("ships"))
+
+@app.post("/fleet/reload")
+def reload_fleet():
+    try:
+        changed = fleet.reload()
+    except (OSError, ValueError, KeyError) as e:
+        raise HTTPException(status_code=500, detail=f"Fleet manifest reload failed: {str(e)}")
+    return {"ships": len(fleet.ship_ids()), "changed": changed, "loaded_at": fleet.loaded_at}
 
 @app.get("/debug/files/{ship_id}")
-async def debug_files(ship_id: str):
-    if ship_id not in available_ships:
+def debug_files(ship_id: str, request: Request):
+    entry = metadata_index.get("files", ship_id)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Ship not found")
-    debug_info: Dict[str, Any] = {}
-    for tank_id in available_ships[ship_id]:
-        tank_paths = get_tank_data_path(ship_id, tank_id)
-        debug_info[tank_id] = {
-            "paths": tank_paths,
-            "exists": {k: os.path.exists(p) for k, p in tank_paths.items()},
-            "file_size": {k: (os.path.getsize(p) if os.path.exists(p) else 0) for k, p in tank_paths.items()},
-        }
-    return {"ship_id": ship_id, "base_dir": base_dir, "ship_dir": ship_dir, "debug_info": debug_info}
+    return cached_json_response(request, entry)
 
 @app.get("/ships/{ship_id}")
-async def get_ship_details(ship_id: str):
-    if ship_id not in available_ships:
+def get_ship_details(ship_id: str, request: Request):
+    entry = metadata_index.get("ship", ship_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Ship not found")
+    return cached_json_response(request, entry)
+
+@app.get("/ships/{ship_id}/ranges")
+def get_ship_ranges(ship_id: str):
+    try:
+        vessel = Vessel(ship_id)
+    except KeyError:
         raise HTTPException(status_code=404, detail="Ship not found")
-    tank_ids = available_ships[ship_id]
-    file_status: Dict[str, Any] = {}
-    for tank_id in tank_ids:
-        tank_paths = get_tank_data_path(ship_id, tank_id)
-        file_status[tank_id] = {
-            "list_table": os.path.exists(tank_paths.get("list_table", "")),
-            "trim_table": os.path.exists(tank_paths.get("trim_table", "")),
-            "volume_table": os.path.exists(tank_paths.get("volume_table", "")) if "volume_table" in tank_paths else None,
-            "temp_table": os.path.exists(tank_paths.get("temp_table", "")) if "temp_table" in tank_paths else None,
-            "press_table": os.path.exists(tank_paths.get("press_table", "")) if "press_table" in tank_paths else None,
+    tanks: Dict[str, Any] = {}
+    for tank in vessel.tanks:
+        try:
+            bounds = tank.bounds
+        except Exception as e:
+            raise HTTPException(status_code=404, detail=f"Calibration tables unavailable for tank {tank.tank_id}: {str(e)}")
+        tanks[tank.tank_id] = {
+            "family": tank.spec.family,
+            "bounds": {field: {"min": low, "max": high} for field, (low, high) in bounds.items()},
         }
-    return {
-        "ship_id": ship_id,
-        "tanks": tank_ids,
-        "tank_count": len(tank_ids),
-        "file_status": file_status,
-    }
+    return {"ship_id": ship_id, "tanks": tanks}
+
+@app.get("/ships/{ship_id}/validate")
+def validate_ship(ship_id: str):
+    tank_ids = fleet.tank_ids(ship_id)
+    if tank_ids is None:
+        raise HTTPException(status_code=404, detail="Ship not found")
+    tanks = {tank_id: validate_tank(ship_id, tank_id) for tank_id in tank_ids}
+    return {"ship_id": ship_id, "valid": all(t["valid"] for t in tanks.values()), "tanks": tanks}
 
 @app.post("/bunkering/calculate", response_model=BunkeringResponse)
 async def calculate_bunkering(
@@ -456,190 +1256,120 @@ async def calculate_bunkering(
         }
     )
 ):
-    try:
-        print(f"=== DEBUG: Starting calculation for ship {request.ship_id} ===")
-        if request.ship_id not in available_ships:
-            raise HTTPException(status_code=400, detail="Invalid ship ID")
-
-        tank_ids = available_ships[request.ship_id]
-        print(f"DEBUG: Tank IDs: {tank_ids}")
-        ship_params = get_ship_parameters(request.ship_id)
-        print(f"DEBUG: Ship params: {ship_params}")
-
-        # Optional vessel-level temperature/pressure correction tables
-        try:
-            ship_data_dir = os.path.join(ship_dir, request.ship_id)
-            tempcorr_path = os.path.join(ship_data_dir, f"tempcorr_table_{tank_ids[0]}.csv")
-            presscorr_path = os.path.join(ship_data_dir, f"presscorr_table_{tank_ids[0]}.csv")
-
-            tempcorr_df = pd.read_csv(tempcorr_path) if os.path.exists(tempcorr_path) else None
-            presscorr_df = pd.read_csv(presscorr_path) if os.path.exists(presscorr_path) else None
-
-            def interpolate_value(df: pd.DataFrame, x_col: str, y_col: str, x_value: float) -> float:
-                interp_func = RegularGridInterpolator((df[x_col].values,), df[y_col].values)
-                return float(interp_func([[x_value]])[0])
-
-            def get_temp_corr(temp_value: float) -> float:
-                return 1.0 if tempcorr_df is None else interpolate_value(tempcorr_df, "Temp", "tcorr", temp_value)
-
-            def get_press_corr(press_value: float) -> float:
-                return 1.0 if presscorr_df is None else interpolate_value(presscorr_df, "Press", "pcorr", press_value)
-
-        except Exception as e:
-            print(f"DEBUG: Failed to initialize correction tables, defaulting to 1.0: {e}")
-
-            def get_temp_corr(temp_value: float) -> float:  # type: ignore
-                return 1.0
-
-            def get_press_corr(press_value: float) -> float:  # type: ignore
-                return 1.0
+    return await calc_executor.run(run_bunkering_calculation, request)
+
+@app.post("/bunkering/calculate/uncertainty", response_model=UncertaintyResponse)
+async def calculate_bunkering_uncertainty(request: UncertaintyRequest):
+    return await calc_executor.run(run_uncertainty_analysis, request)
+
+@app.post("/bunkering/inverse", response_model=InverseResponse)
+async def calculate_closing_levels(request: InverseRequest):
+    return await calc_executor.run(run_inverse_calculation, request)
+
+@app.post("/bunkering/calculate/batch", response_model=BatchBunkeringResponse)
+async def calculate_bunkering_batch(requests: List[BunkeringRequest] = Body(...)):
+    if len(requests) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items")
+    items: List[BatchItemResult] = []
+    outcomes = await calc_executor.run(calculate_bunkering_many, requests)
+    for i, outcome in enumerate(outcomes):
+        if isinstance(outcome, CalculationError):
+            items.append(BatchItemResult(index=i, status_code=outcome.status_code, error=str(outcome.detail)))
+        else:
+            items.append(BatchItemResult(index=i, status_code=200, result=outcome))
+    succeeded = sum(1 for item in items if item.result is not None)
+    return BatchBunkeringResponse(
+        count=len(items), succeeded=succeeded, failed=len(items) - succeeded, results=items
+    )
 
-        # Parse times
-        try:
-            opening_datetime = datetime.strptime(request.opening_time, "%m/%d/%Y %H:%M")
-            closing_datetime = datetime.strptime(request.closing_time, "%m/%d/%Y %H:%M")
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid time format. Use MM/DD/YYYY HH:MM")
-        if closing_datetime <= opening_datetime:
-            raise HTTPException(status_code=400, detail="Closing time must be after opening time")
-
-        difference_in_hours = (closing_datetime - opening_datetime).total_seconds() / 3600.0
-        print(f"DEBUG: Time difference: {difference_in_hours} hours")
-
-        # Opening tank 1
-        print("DEBUG: Computing corrected values for opening tank 1 ...")
-        cl1, cv1 = compute_corrected_values(
-            request.ship_id,
-            tank_ids[0],
-            request.opening_tank1.level,
-            request.opening_list,
-            request.opening_trim,
-            request.opening_tank1.vapor_temp,
-            request.opening_tank1.pressure,
-        )
-        print(f"DEBUG: Corrected level1: {cl1}, volume1: {cv1}")
-        if cl1 is None or cv1 is None:
-            raise HTTPException(status_code=500, detail="Failed to compute corrected values for opening tank 1")
-
-        temp_corr1 = get_temp_corr(request.opening_tank1.liquid_temp)
-        press_corr1 = get_press_corr(request.opening_tank1.pressure)
-        liquid_volume1 = cv1 * temp_corr1 * press_corr1
-        vap_corr1 = (273 + 15) / (273 + request.opening_tank1.vapor_temp) * (1.013 + request.opening_tank1.pressure) / 1.013 * 0.6785
-        vnet1 = ship_params["LNG_TK1_cap"] - liquid_volume1
-        vnet_corr1 = vnet1 * vap_corr1
-        vap_volume1 = vnet_corr1 / request.density / 1000.0
-        total_volume1 = float(liquid_volume1 + vap_volume1)
-
-        # Opening tank 2 (if exists)
-        total_volume2 = 0.0
-        if len(tank_ids) > 1 and request.opening_tank2:
-            print("DEBUG: Computing corrected values for opening tank 2 ...")
-            cl2, cv2 = compute_corrected_values(
-                request.ship_id,
-                tank_ids[1],
-                request.opening_tank2.level,
-                request.opening_list,
-                request.opening_trim,
-                request.opening_tank2.vapor_temp,
-                request.opening_tank2.pressure,
-            )
-            print(f"DEBUG: Corrected level2: {cl2}, volume2: {cv2}")
-            if cl2 is not None and cv2 is not None:
-                temp_corr2 = get_temp_corr(request.opening_tank2.liquid_temp)
-                press_corr2 = get_press_corr(request.opening_tank2.pressure)
-                liquid_volume2 = cv2 * temp_corr2 * press_corr2
-                vap_corr2 = (273 + 15) / (273 + request.opening_tank2.vapor_temp) * (1.013 + request.opening_tank2.pressure) / 1.013 * 0.6785
-                vnet2 = ship_params.get("LNG_TK2_cap", ship_params["LNG_TK1_cap"]) - liquid_volume2
-                vnet_corr2 = vnet2 * vap_corr2
-                vap_volume2 = vnet_corr2 / request.density / 1000.0
-                total_volume2 = float(liquid_volume2 + vap_volume2)
-
-        grand_total_volume_opening = total_volume1 + total_volume2
-        print(f"DEBUG: Grand total opening: {grand_total_volume_opening}")
-
-        # Closing tank 1
-        print("DEBUG: Computing corrected values for closing tank 1 ...")
-        cl3, cv3 = compute_corrected_values(
-            request.ship_id,
-            tank_ids[0],
-            request.closing_tank1.level,
-            request.closing_list,
-            request.closing_trim,
-            request.closing_tank1.vapor_temp,
-            request.closing_tank1.pressure,
-        )
-        print(f"DEBUG: Corrected level3: {cl3}, volume3: {cv3}")
-        if cl3 is None or cv3 is None:
-            raise HTTPException(status_code=500, detail="Failed to compute corrected values for closing tank 1")
-
-        temp_corr3 = get_temp_corr(request.closing_tank1.liquid_temp)
-        press_corr3 = get_press_corr(request.closing_tank1.pressure)
-        liquid_volume3 = cv3 * temp_corr3 * press_corr3
-        vap_corr3 = (273 + 15) / (273 + request.closing_tank1.vapor_temp) * (1.013 + request.closing_tank1.pressure) / 1.013 * 0.6785
-        vnet3 = ship_params["LNG_TK1_cap"] - liquid_volume3
-        vnet_corr3 = vnet3 * vap_corr3
-        vap_volume3 = vnet_corr3 / request.density / 1000.0
-        total_volume3 = float(liquid_volume3 + vap_volume3)
-
-        # Closing tank 2 (if exists)
-        total_volume4 = 0.0
-        if len(tank_ids) > 1 and request.closing_tank2:
-            print("DEBUG: Computing corrected values for closing tank 2 ...")
-            cl4, cv4 = compute_corrected_values(
-                request.ship_id,
-                tank_ids[1],
-                request.closing_tank2.level,
-                request.closing_list,
-                request.closing_trim,
-                request.closing_tank2.vapor_temp,
-                request.closing_tank2.pressure,
-            )
-            print(f"DEBUG: Corrected level4: {cl4}, volume4: {cv4}")
-            if cl4 is not None and cv4 is not None:
-                temp_corr4 = get_temp_corr(request.closing_tank2.liquid_temp)
-                press_corr4 = get_press_corr(request.closing_tank2.pressure)
-                liquid_volume4 = cv4 * temp_corr4 * press_corr4
-                vap_corr4 = (273 + 15) / (273 + request.closing_tank2.vapor_temp) * (1.013 + request.closing_tank2.pressure) / 1.013 * 0.6785
-                vnet4 = ship_params.get("LNG_TK2_cap", ship_params["LNG_TK1_cap"]) - liquid_volume4
-                vnet_corr4 = vnet4 * vap_corr4
-                vap_volume4 = vnet_corr4 / request.density / 1000.0
-                total_volume4 = float(liquid_volume4 + vap_volume4)
-
-        grand_total_volume_closing = total_volume3 + total_volume4
-        print(f"DEBUG: Grand total closing: {grand_total_volume_closing}")
-
-        # Final results
-        vol_diff = grand_total_volume_closing - grand_total_volume_opening
-        bog_cons = (request.bog * difference_in_hours / request.density) / 1000.0
-        loaded_qty = vol_diff + bog_cons
-        total_loaded_qty = loaded_qty + request.unreckoned_qty
-        net_qty = request.net_energy / (request.gross_energy / request.bdn_quantity)
-        diff = total_loaded_qty - net_qty
-
-        print("=== DEBUG: Calculation completed successfully ===")
-        return BunkeringResponse(
-            ship_id=request.ship_id,
-            tank1_volume_opening=round(total_volume1, 2),
-            tank2_volume_opening=round(total_volume2, 2) if len(tank_ids) > 1 else None,
-            tank1_volume_closing=round(total_volume3, 2),
-            tank2_volume_closing=round(total_volume4, 2) if len(tank_ids) > 1 else None,
-            opening_quantity=round(grand_total_volume_opening, 2),
-            closing_quantity=round(grand_total_volume_closing, 2),
-            volume_difference=round(vol_diff, 2),
-            bog_consumption=round(bog_cons, 2),
-            loaded_quantity=round(total_loaded_qty, 2),
-            net_quantity=round(net_qty, 2),
-            difference=round(diff, 2),
-            calculation_time=datetime.now().isoformat(),
-        )
+@app.post("/fleet/inventory", response_model=InventorySnapshotResponse)
+async def fleet_inventory(request: InventorySnapshotRequest):
+    tank_count = sum(len(ship.tanks) for ship in request.ships)
+    if tank_count > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Snapshot exceeds {BATCH_MAX_ITEMS} tank soundings")
+    # Ships are split across the calculation executor's workers; each chunk
+    # is one executor job, so a large fleet does not fill the pending queue
+    parts = []
+    if request.ships:
+        chunks = max(min(calc_executor.workers, len(request.ships)), 1)
+        size = -(-len(request.ships) // chunks)
+        parts = [request.ships[i:i + size] for i in range(0, len(request.ships), size)]
+    outcomes = await asyncio.gather(*(calc_executor.run(ship_inventories, part) for part in parts))
+    ships = [ship for part in outcomes for ship in part]
+    failed = sum(1 for ship in ships for tank in ship.tanks if tank.status_code != 200)
+    return InventorySnapshotResponse(
+        ship_count=len(ships),
+        tank_count=tank_count,
+        failed=failed,
+        total_volume=round(sum(ship.total_volume or 0.0 for ship in ships), 2),
+        snapshot_time=datetime.now().isoformat(),
+        ships=ships,
+    )
 
+@app.websocket("/bunkering/live")
+async def bunkering_live(websocket: WebSocket):
+    """First message starts the session (LiveSessionStart), then one LiveReading (or a list) per message."""
+    await websocket.accept()
+    try:
+        session = LiveSession(LiveSessionStart.model_validate_json(await websocket.receive_text()))
+        # Table loading is the only slow step; keep it off the event loop
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, session.warm)
+    except WebSocketDisconnect:
+        return
+    except ValidationError as e:
+        await websocket.send_json(live_error(422, json.loads(e.json(include_url=False))))
+        await websocket.close(code=1008)
+        return
+    except KeyError:
+        await websocket.send_json(live_error(400, "Invalid ship ID"))
+        await websocket.close(code=1008)
+        return
     except Exception as e:
-        print("=== DEBUG: Error occurred ===")
-        print(f"Error type: {type(e)}")
-        print(f"Error message: {str(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
-        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+        await websocket.send_json(live_error(500, f"Failed to load tables: {e}"))
+        await websocket.close(code=1011)
+        return
+    await websocket.send_json({"type": "started", "ship_id": session.vessel.ship_id, "tank_ids": session.vessel.tank_ids})
+
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+            except ValueError:
+                await websocket.send_json(live_error(400, "Invalid JSON"))
+                continue
+            # Off the event loop like the other calculations; one reading at a time keeps the order
+            for item in message if isinstance(message, list) else [message]:
+                started = time.perf_counter()
+                status = 200
+                try:
+                    reply = await loop.run_in_executor(None, session.update, LiveReading.model_validate(item))
+                except ValidationError as e:
+                    status, reply = 422, live_error(422, json.loads(e.json(include_url=False)))
+                except HTTPException as e:
+                    status, reply = e.status_code, live_error(e.status_code, e.detail)
+                request_seconds.observe(time.perf_counter() - started, "/bunkering/live", "WS", str(status))
+                await websocket.send_json(reply)
+    except WebSocketDisconnect:
+        pass
+
+@app.post("/bunkering/calculate/stream")
+async def calculate_bunkering_stream(
+    file: UploadFile = File(..., description="NDJSON (one request per line) or CSV with flattened tank columns"),
+    input_format: Optional[str] = Query(None, pattern="^(ndjson|csv)$", description="Defaults from the file name"),
+    output_format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+):
+    if input_format is None:
+        input_format = "csv" if (file.filename or "").lower().endswith(".csv") else "ndjson"
+    results = iter_bunkering_results(iter_upload_records(file, input_format))
+    if output_format == "csv":
+        return StreamingResponse(format_csv(results), media_type="text/csv")
+    return StreamingResponse(format_ndjson(results), media_type="application/x-ndjson")
 
 if __name__ == "__main__":
+    # "python api.py reconcile ..." runs the offline bulk reconciliation instead (see reconcile.py)
+    if sys.argv[1:2] == ["reconcile"]:
+        from reconcile import main
+        sys.exit(main(sys.argv[2:]))
     uvicorn.run(app, host="0.0.0.0", port=8000)
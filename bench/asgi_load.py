@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""In-process ASGI load generator.
+
+Drives an ASGI app directly (no sockets, no HTTP client dependency) with a
+fixed number of concurrent callers, so the numbers measure the application
+stack itself: routing, validation, the calculation executor and
+serialisation.
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+async def asgi_request(app, method: str, path: str, body: bytes = b"") -> Tuple[int, bytes]:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"bench"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("bench", 0),
+        "server": ("bench", 80),
+    }
+    done = asyncio.Event()
+    request_sent = False
+    status = 0
+    chunks: List[bytes] = []
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                done.set()
+
+    await app(scope, receive, send)
+    done.set()
+    return status, b"".join(chunks)
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    index = min(int(round(q / 100.0 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(percentile(ordered, 50) * 1e3, 4),
+        "p95_ms": round(percentile(ordered, 95) * 1e3, 4),
+        "p99_ms": round(percentile(ordered, 99) * 1e3, 4),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1e3, 4) if ordered else float("nan"),
+        "throughput_per_s": round(len(ordered) / elapsed, 1) if elapsed > 0 else float("nan"),
+    }
+
+async def run_load(
+    app,
+    make_request: Callable[[int], Tuple[str, str, bytes]],
+    total: int,
+    concurrency: int,
+    keep_bodies: bool = False,
+) -> Dict[str, Any]:
+    """Send ``total`` requests from ``concurrency`` callers; ``make_request(i)`` gives (method, path, body)."""
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    bodies: List[Optional[bytes]] = [None] * total if keep_bodies else []
+    next_index = 0
+
+    async def caller() -> None:
+        nonlocal next_index
+        while next_index < total:
+            i = next_index
+            next_index += 1
+            method, path, body = make_request(i)
+            started = time.perf_counter()
+            status, response = await asgi_request(app, method, path, body)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+            if keep_bodies:
+                bodies[i] = response
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    report: Dict[str, Any] = summarize(latencies, elapsed)
+    report["statuses"] = {str(k): v for k, v in sorted(statuses.items())}
+    if keep_bodies:
+        report["bodies"] = bodies
+    return report
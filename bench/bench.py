@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""Latency, throughput and memory benchmarks with a baseline regression gate.
+
+    python bench/bench.py                                  # run and print a report
+    python bench/bench.py --save bench/baseline.json       # record a baseline
+    python bench/bench.py --compare bench/baseline.json    # exit 1 on regression
+
+One scenario per tank layout in the fleet manifest (5-table two-tank ships,
+list/trim-only LNG_TK, ZIM LNG_TANK and the LNGAS_TK alias), each run on the
+first ship that uses it, with seeded readings inside the tank's bounds:
+
+- compute_corrected_values: per-call latency, cold (unique readings) and warm
+  (the same readings again, served by the result cache).
+- POST /bunkering/calculate: latency and throughput through the full ASGI
+  stack, driven in-process by bench/asgi_load.py.
+- Memory: RSS of this process after import and with the whole fleet loaded,
+  i.e. what one API worker holds.
+
+The gate fails when any scenario's results differ from the baseline (digest
+of every rounded output) or a p50 latency, throughput or RSS figure is worse
+than the baseline by more than --tolerance. Record baselines on the machine
+that runs the gate; timings do not transfer between machines.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_dir)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("DATA_WATCH_INTERVAL", "0")
+
+from asgi_load import run_load, summarize  # noqa: E402
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024.0, 1)
+    except OSError:
+        pass
+    import resource
+    # ru_maxrss is KiB on Linux, bytes on macOS; peak rather than current
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0), 1)
+
+def digest(values: Any) -> str:
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode()).hexdigest()[:16]
+
+def pick_scenarios(fleet) -> Dict[str, str]:
+    """First ship for every distinct (family, tank ID) layout, e.g. ``full:LNG_TK1+full:LNG_TK2``."""
+    scenarios: Dict[str, str] = {}
+    for ship_id in fleet.ship_ids():
+        ship = fleet.ship(ship_id)
+        name = "+".join(f"{tank.family}:{tank.tank_id}" for tank in ship.tanks)
+        scenarios.setdefault(name, ship_id)
+    return scenarios
+
+def _inside(rng: random.Random, bounds: Dict[str, Tuple[float, float]], field: str,
+            typical: Tuple[float, float], margin: float = 0.1) -> float:
+    low, high = typical
+    if field in bounds:
+        b_low, b_high = bounds[field]
+        span = b_high - b_low
+        low, high = max(low, b_low + margin * span), min(high, b_high - margin * span)
+        if low > high:
+            low, high = b_low + margin * span, b_high - margin * span
+    return rng.uniform(low, high)
+
+def make_payloads(vessel, count: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    bounds = [tank.bounds for tank in vessel.tanks]
+    payloads = []
+    for _ in range(count):
+        payload: Dict[str, Any] = {"ship_id": vessel.ship_id}
+        for phase in ("opening", "closing"):
+            payload[f"{phase}_list"] = _inside(rng, bounds[0], "list", (-1.5, 1.5), margin=0.3)
+            payload[f"{phase}_trim"] = _inside(rng, bounds[0], "trim", (-2.0, 1.0), margin=0.3)
+            for position, tank_bounds in enumerate(bounds[:2]):
+                payload[f"{phase}_tank{position + 1}"] = {
+                    "level": _inside(rng, tank_bounds, "level", (-1e12, 1e12)),
+                    "vapor_temp": _inside(rng, tank_bounds, "vapor_temp", (-160.0, -130.0)),
+                    "liquid_temp": _inside(rng, tank_bounds, "liquid_temp", (-162.0, -150.0)),
+                    "pressure": _inside(rng, tank_bounds, "pressure", (0.05, 0.6)),
+                }
+        payload.update({
+            "opening_time": "07/10/2025 10:00",
+            "closing_time": "07/10/2025 16:30",
+            "density": 0.45,
+            "bdn_quantity": 1000.0,
+            "bog": 300.0,
+            "gross_energy": 10000.0,
+            "unreckoned_qty": 1.5,
+            "net_energy": 9800.0,
+        })
+        payloads.append(payload)
+    return payloads
+
+def best(summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # Best-of-N by p50: the least-disturbed run is the most repeatable figure to gate on
+    return min(summaries, key=lambda s: s["p50_ms"])
+
+def bench_compute_corrected_values(api, vessel, payloads: List[Dict[str, Any]], repeat: int) -> Dict[str, Any]:
+    calls = []
+    for payload in payloads:
+        for label, position, attr, phase in api.tank_slots:
+            if position < len(vessel.tanks) and attr in payload:
+                reading = payload[attr]
+                calls.append((
+                    vessel.ship_id, vessel.tanks[position].tank_id, reading["level"],
+                    payload[f"{phase}_list"], payload[f"{phase}_trim"], reading["vapor_temp"], reading["pressure"],
+                ))
+
+    def timed_pass(keep: Optional[List[Any]] = None) -> Dict[str, Any]:
+        latencies = []
+        started = time.perf_counter()
+        for args in calls:
+            t0 = time.perf_counter()
+            result = api.compute_corrected_values(*args)
+            latencies.append(time.perf_counter() - t0)
+            if keep is not None:
+                keep.append(result)
+        return summarize(latencies, time.perf_counter() - started)
+
+    outputs: List[Any] = []
+    cold = []
+    for attempt in range(repeat):
+        api.table_registry.results.clear()
+        cold.append(timed_pass(outputs if attempt == 0 else None))
+    warm = [timed_pass() for _ in range(repeat)]
+    return {"cold": best(cold), "warm": best(warm), "digest": digest(outputs)}
+
+def bench_api(api, payloads: List[Dict[str, Any]], requests: int, concurrency: int, repeat: int) -> Dict[str, Any]:
+    bodies = [json.dumps(p).encode() for p in payloads]
+    loads = []
+    for _ in range(repeat):
+        api.table_registry.results.clear()
+        loads.append(asyncio.run(run_load(
+            api.app,
+            lambda i: ("POST", "/bunkering/calculate", bodies[i % len(bodies)]),
+            requests,
+            concurrency,
+            keep_bodies=True,
+        )))
+    load = best(loads)
+    results = []
+    for body in load.pop("bodies")[:len(payloads)]:
+        result = json.loads(body)
+        if isinstance(result, dict):
+            result.pop("calculation_time", None)
+        results.append(result)
+    load["digest"] = digest(results)
+    return load
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    memory: Dict[str, float] = {"rss_start_mb": rss_mb()}
+    import api
+    from engine import Vessel, table_registry
+
+    memory["rss_after_import_mb"] = rss_mb()
+    report: Dict[str, Any] = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": __import__("numpy").__version__,
+            "machine": platform.machine(),
+            "calls": args.calls,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "memory": memory,
+        "scenarios": {},
+    }
+
+    started = time.perf_counter()
+    for ship_id in api.fleet.ship_ids():
+        for tank_id in api.fleet.tank_ids(ship_id):
+            try:
+                # get() only builds the lazy shell; load every table so the RSS figure means something
+                table_registry.get(ship_id, tank_id).load_all()
+            except Exception as e:
+                print(f"warning: {ship_id} {tank_id} failed to load: {e}", file=sys.stderr)
+    memory["fleet_load_s"] = round(time.perf_counter() - started, 3)
+    memory["rss_fleet_loaded_mb"] = rss_mb()
+
+    for name, ship_id in pick_scenarios(api.fleet).items():
+        if args.scenario and not any(s in name or s == ship_id for s in args.scenario):
+            continue
+        vessel = Vessel(ship_id)
+        payloads = make_payloads(vessel, args.calls, args.seed)
+        scenario = {
+            "ship_id": ship_id,
+            "compute_corrected_values": bench_compute_corrected_values(api, vessel, payloads, args.repeat),
+            "api": bench_api(api, payloads, args.requests, args.concurrency, args.repeat),
+        }
+        report["scenarios"][name] = scenario
+        print(f"{name} ({ship_id}): compute_corrected_values cold p50 "
+              f"{scenario['compute_corrected_values']['cold']['p50_ms']} ms, warm p50 "
+              f"{scenario['compute_corrected_values']['warm']['p50_ms']} ms | /bunkering/calculate p50 "
+              f"{scenario['api']['p50_ms']} ms, {scenario['api']['throughput_per_s']} req/s "
+              f"{scenario['api']['statuses']}", file=sys.stderr)
+    api.calc_executor.shutdown()
+    print(f"memory: {memory}", file=sys.stderr)
+    return report
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of ``report`` against ``baseline``; an empty list passes."""
+    failures: List[str] = []
+
+    def slower(where: str, new: Optional[float], old: Optional[float]) -> None:
+        if new is not None and old and new > old * (1 + tolerance):
+            failures.append(f"{where}: {new} vs baseline {old} (>{tolerance:.0%} worse)")
+
+    for name, old in baseline.get("scenarios", {}).items():
+        new = report["scenarios"].get(name)
+        if new is None:
+            failures.append(f"{name}: scenario missing")
+            continue
+        for part in ("compute_corrected_values", "api"):
+            if new[part]["digest"] != old[part]["digest"]:
+                failures.append(f"{name} {part}: results differ from baseline")
+        slower(f"{name} compute_corrected_values cold p50_ms",
+               new["compute_corrected_values"]["cold"]["p50_ms"], old["compute_corrected_values"]["cold"]["p50_ms"])
+        slower(f"{name} compute_corrected_values warm p50_ms",
+               new["compute_corrected_values"]["warm"]["p50_ms"], old["compute_corrected_values"]["warm"]["p50_ms"])
+        slower(f"{name} api p50_ms", new["api"]["p50_ms"], old["api"]["p50_ms"])
+        new_rate, old_rate = new["api"]["throughput_per_s"], old["api"]["throughput_per_s"]
+        if old_rate and new_rate < old_rate / (1 + tolerance):
+            failures.append(f"{name} api throughput_per_s: {new_rate} vs baseline {old_rate}")
+    slower("rss_fleet_loaded_mb", report["memory"].get("rss_fleet_loaded_mb"), baseline.get("memory", {}).get("rss_fleet_loaded_mb"))
+    return failures
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark compute_corrected_values and /bunkering/calculate")
+    parser.add_argument("--calls", type=int, default=500, help="Distinct requests per scenario (default 500)")
+    parser.add_argument("--requests", type=int, default=1000, help="API requests per scenario (default 1000)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent API callers (default 16)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement, best p50 kept (default 5)")
+    parser.add_argument("--scenario", action="append", help="Only scenarios whose name or ship matches (repeatable)")
+    parser.add_argument("--json", help="Write the full report to this file")
+    parser.add_argument("--save", help="Write the report as a new baseline")
+    parser.add_argument("--compare", help="Baseline to gate against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs baseline (default 0.25)")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    for path in (args.json, args.save):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=1)
+    if not args.json and not args.save:
+        print(json.dumps(report, indent=1))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("seed") != args.seed or baseline["meta"].get("calls") != args.calls:
+            print("warning: baseline was recorded with different --seed/--calls; digests will differ", file=sys.stderr)
+        failures = compare(report, baseline, args.tolerance)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        print("benchmark gate: " + ("FAIL" if failures else "PASS"), file=sys.stderr)
+        return 1 if failures else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
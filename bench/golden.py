@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""Golden-value corpus and differential checker for the correction engine.
+
+    python bench/golden.py generate        # rebuild bench/golden_corpus.npz
+    python bench/golden.py check           # compare the current engine against it
+    python bench/golden.py check --scalar  # also the memoized scalar path, at 2 dp
+
+The corpus holds seeded readings for every tank of every ship in the fleet
+manifest: grid nodes, exact table edges and random points across each axis,
+with a few outside the tables so NaN handling is covered too. The reference
+outputs come from the original path: SciPy RegularGridInterpolator over the
+CSV tables (INTERP_ENGINE=scipy, no compiled bundles). They are the corrected
+level and volume, and the liquid temperature/pressure correction factors.
+
+``check`` evaluates the whole corpus with the vectorized engine as currently
+configured (engine, bundles, dtype) and reports the maximum absolute
+deviation per ship and tank. It fails on any deviation above --atol, on any
+NaN/non-NaN disagreement, and on any value that rounds differently at the
+reported 2 dp.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_dir)
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_corpus.npz")
+inputs = ["level", "list", "trim", "vapor_temp", "pressure", "liquid_temp"]
+outputs = ["corrected_level", "corrected_volume", "temp_corr", "press_corr"]
+
+def _axis_points(rng: np.random.Generator, axis: np.ndarray, count: int, spread: float = 0.0) -> np.ndarray:
+    """Nodes, both edges and uniform points; ``spread`` extends the range by that fraction each way."""
+    low, high = float(axis[0]), float(axis[-1])
+    pad = spread * (high - low)
+    nodes = rng.choice(np.asarray(axis, dtype=float), size=count // 4)
+    edges = np.array([low, high])
+    uniform = rng.uniform(low - pad, high + pad, size=count - len(nodes) - len(edges))
+    points = np.concatenate([nodes, edges, uniform])
+    rng.shuffle(points)
+    return points
+
+def _evaluate(tables, points: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    corrected_level, corrected_volume = tables.correct_many(
+        points["level"], points["list"], points["trim"], points["vapor_temp"], points["pressure"]
+    )
+    return {
+        "corrected_level": corrected_level,
+        "corrected_volume": corrected_volume,
+        "temp_corr": tables.temp_corr_many(points["liquid_temp"]),
+        "press_corr": tables.press_corr_many(points["pressure"]),
+    }
+
+def generate(points_per_tank: int, seed: int, path: str) -> None:
+    import scipy
+
+    from engine import TankTables, fleet
+
+    rng = np.random.default_rng(seed)
+    keys: List[str] = []
+    columns: Dict[str, List[np.ndarray]] = {name: [] for name in ["key"] + inputs + outputs}
+    for ship_id in fleet.ship_ids():
+        for tank_id in fleet.tank_ids(ship_id):
+            try:
+                reference = TankTables(ship_id, tank_id, engine="scipy", use_bundles=False)
+            except Exception as e:
+                print(f"skipping {ship_id} {tank_id}: {e}", file=sys.stderr)
+                continue
+            n = points_per_tank
+            bounds = dict(reference.bounds)
+            points = {
+                "level": _axis_points(rng, reference.list_interpolator.grid[0], n, spread=0.02),
+                "list": _axis_points(rng, reference.list_interpolator.grid[1], n),
+                "trim": _axis_points(rng, reference.trim_interpolator.grid[1], n),
+            }
+            if reference.temp_interpolator is not None:
+                points["vapor_temp"] = _axis_points(rng, reference.temp_interpolator.grid[1], n)
+                points["pressure"] = _axis_points(rng, reference.press_interpolator.grid[1], n)
+            else:
+                points["vapor_temp"] = rng.uniform(-163.0, -100.0, n)
+                points["pressure"] = rng.uniform(0.0, 0.7, n)
+            if reference.presscorr_interpolator is not None:
+                # Pressure feeds both the press table and the correction curve
+                low, high = reference.correction_bounds["pressure"]
+                if "pressure" in bounds:
+                    low, high = max(low, bounds["pressure"][0]), min(high, bounds["pressure"][1])
+                points["pressure"] = np.clip(points["pressure"], low, high)
+            if reference.tempcorr_interpolator is not None:
+                points["liquid_temp"] = _axis_points(rng, reference.tempcorr_interpolator.grid[0], n, spread=0.02)
+            else:
+                points["liquid_temp"] = rng.uniform(-163.0, -150.0, n)
+
+            results = _evaluate(reference, points)
+            keys.append(f"{ship_id}|{tank_id}")
+            columns["key"].append(np.full(n, len(keys) - 1, dtype=np.int32))
+            for name in inputs:
+                columns[name].append(points[name])
+            for name in outputs:
+                columns[name].append(np.asarray(results[name], dtype=float))
+
+    meta = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "reference": "scipy RegularGridInterpolator over CSV tables",
+        "scipy": scipy.__version__,
+        "numpy": np.__version__,
+        "points_per_tank": points_per_tank,
+        "seed": seed,
+    }
+    np.savez_compressed(
+        path,
+        keys=np.array(keys),
+        meta=np.array(json.dumps(meta)),
+        **{name: np.concatenate(parts) for name, parts in columns.items()},
+    )
+    print(f"wrote {path}: {len(keys)} tanks, {sum(len(k) for k in columns['key'])} points", file=sys.stderr)
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    return np.array([round(v, 2) for v in values.tolist()])
+
+def check(path: str, atol: float, scalar: bool, max_rounding: int) -> int:
+    from engine import Vessel, table_registry
+
+    with np.load(path) as archive:
+        corpus = {name: archive[name] for name in archive.files}
+    meta = json.loads(str(corpus["meta"]))
+    keys = corpus["keys"].tolist()
+    started = time.perf_counter()
+    failures = 0
+    report: List[Dict[str, Any]] = []
+    for index, key in enumerate(keys):
+        ship_id, tank_id = key.split("|")
+        rows = corpus["key"] == index
+        points = {name: corpus[name][rows] for name in inputs}
+        try:
+            results = _evaluate(table_registry.get(ship_id, tank_id), points)
+        except Exception as e:
+            print(f"FAIL {ship_id} {tank_id}: {e}", file=sys.stderr)
+            failures += 1
+            continue
+
+        entry: Dict[str, Any] = {"ship_id": ship_id, "tank_id": tank_id, "points": int(rows.sum())}
+        failed = False
+        for name in outputs:
+            expected = corpus[name][rows]
+            actual = np.asarray(results[name], dtype=float)
+            nan_mismatch = int((np.isnan(expected) != np.isnan(actual)).sum())
+            both = ~np.isnan(expected) & ~np.isnan(actual)
+            deviation = float(np.abs(actual[both] - expected[both]).max()) if both.any() else 0.0
+            rounding = int((_round2(actual[both]) != _round2(expected[both])).sum())
+            entry[name] = {"max_abs": deviation, "nan_mismatch": nan_mismatch, "rounding_2dp": rounding}
+            failed |= deviation > atol or nan_mismatch > 0 or rounding > max_rounding
+
+        if scalar:
+            tank = Vessel(ship_id).tank(tank_id)
+            mismatches = 0
+            expected_level, expected_volume = corpus["corrected_level"][rows], corpus["corrected_volume"][rows]
+            for i in range(int(rows.sum())):
+                try:
+                    got = tank.correct(*(float(points[name][i]) for name in inputs[:5]))
+                except ValueError:
+                    got = None
+                # The scalar path raises where the vectorized one gives NaN for either output
+                if np.isnan(expected_level[i]) or np.isnan(expected_volume[i]):
+                    mismatches += got is not None
+                else:
+                    mismatches += got != (round(float(expected_level[i]), 2), round(float(expected_volume[i]), 2))
+            entry["scalar_2dp_mismatch"] = mismatches
+            failed |= mismatches > max_rounding
+        failures += failed
+        entry["ok"] = not failed
+        report.append(entry)
+
+    elapsed = time.perf_counter() - started
+    name_width = max(len(f"{e['ship_id']} {e['tank_id']}") for e in report) if report else 10
+    print(f"{'ship tank':<{name_width}}  " + "  ".join(f"{n:>16}" for n in outputs))
+    for entry in report:
+        flag = "" if entry["ok"] else "  <-- FAIL"
+        cells = "  ".join(f"{entry[n]['max_abs']:>16.3e}" for n in outputs)
+        extra = f"  scalar_2dp={entry['scalar_2dp_mismatch']}" if scalar else ""
+        issues = sum(entry[n]["nan_mismatch"] + entry[n]["rounding_2dp"] for n in outputs)
+        print(f"{entry['ship_id'] + ' ' + entry['tank_id']:<{name_width}}  {cells}  nan/2dp={issues}{extra}{flag}")
+    total = int(sum(e["points"] for e in report))
+    worst = {n: max((e[n]["max_abs"] for e in report), default=0.0) for n in outputs}
+    print(f"\n{total} points, {len(report)} tanks in {elapsed:.2f}s against corpus of {meta['generated_at']} "
+          f"(scipy {meta['scipy']}); worst max_abs: " + ", ".join(f"{n}={v:.3e}" for n, v in worst.items()))
+    print("golden check: " + ("FAIL" if failures else "PASS") + f" ({failures} tanks failing, atol={atol})")
+    return 1 if failures else 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Golden-value corpus for the correction engine")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gen = sub.add_parser("generate", help="Rebuild the corpus from the SciPy-over-CSV reference path")
+    gen.add_argument("--points", type=int, default=256, help="Points per tank (default 256)")
+    gen.add_argument("--seed", type=int, default=20240710)
+    gen.add_argument("--output", default=CORPUS_PATH)
+    chk = sub.add_parser("check", help="Compare the current engine against the corpus")
+    chk.add_argument("--corpus", default=CORPUS_PATH)
+    chk.add_argument("--atol", type=float, default=1e-9, help="Max absolute deviation allowed (default 1e-9)")
+    chk.add_argument("--max-rounding", type=int, default=0,
+                     help="Values allowed to round differently at 2 dp per tank (default 0)")
+    chk.add_argument("--scalar", action="store_true", help="Also check the memoized scalar Tank.correct path")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        generate(args.points, args.seed, args.output)
+        return 0
+    return check(args.corpus, args.atol, args.scalar, args.max_rounding)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""Bunkering request models and the batch calculation, usable without the web stack.
+
+The pydantic request/response models of /bunkering/calculate and the
+vectorized path behind the batch and stream endpoints live here rather than in
+api.py, so the offline reconciliation CLI and its worker processes can
+evaluate records without importing FastAPI, the data watcher or the metrics
+registry:
+
+    from bunkering import iter_bunkering_results, unflatten_record
+
+    for item in iter_bunkering_results(unflatten_record(row) for row in rows):
+        ...
+
+Failures are CalculationError, carrying the status code the API answers with.
+"""
+
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, Field, ValidationError
+
+from engine import Vessel, compute_quantities, fleet
+from observability import span
+from tables import TableError
+
+class CalculationError(Exception):
+    """A calculation failure with the HTTP status the API answers it with.
+
+    Raised, or returned in place of a result by the batch functions. Plain and
+    picklable, so it crosses process pools unchanged (some Starlette versions
+    cannot unpickle HTTPException); api.py maps it to an HTTP response.
+    """
+
+    def __init__(self, status_code: int, detail: Any = None):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+# Models
+class TankInput(BaseModel):
+    level: float = Field(..., description="Tank level in mm")
+    vapor_temp: float = Field(..., description="Vapor temperature in °C")
+    liquid_temp: float = Field(..., description="Liquid temperature in °C")
+    pressure: float = Field(..., description="Gauge pressure in Bar")
+
+class BunkeringRequest(BaseModel):
+    ship_id: str = Field(..., description="Ship identifier")
+    opening_tank1: TankInput
+    opening_tank2: Optional[TankInput] = None
+    closing_tank1: TankInput
+    closing_tank2: Optional[TankInput] = None
+
+    opening_trim: float = Field(..., description="Opening trim in m")
+    opening_list: float = Field(..., description="Opening list in degrees")
+    closing_trim: float = Field(..., description="Closing trim in m")
+    closing_list: float = Field(..., description="Closing list in degrees")
+
+    opening_time: str = Field(..., description="Opening time (MM/DD/YYYY HH:MM)")
+    closing_time: str = Field(..., description="Closing time (MM/DD/YYYY HH:MM)")
+
+    density: float = Field(..., description="Density in kg/m3")
+    bdn_quantity: float = Field(..., description="BDN quantity in m3")
+    bog: float = Field(..., description="Average BOG in kg/h")
+    gross_energy: float = Field(..., description="Gross energy in MMBtu or MWh")
+    unreckoned_qty: float = Field(..., description="Unreckoned quantity in m3")
+    net_energy: float = Field(..., description="Net energy in MMBtu or MWh")
+
+class BunkeringResponse(BaseModel):
+    ship_id: str
+    tank1_volume_opening: float
+    tank2_volume_opening: Optional[float]
+    tank1_volume_closing: float
+    tank2_volume_closing: Optional[float]
+    opening_quantity: float
+    closing_quantity: float
+    volume_difference: float
+    bog_consumption: float
+    loaded_quantity: float
+    net_quantity: float
+    difference: float
+    calculation_time: str
+
+class BatchItemResult(BaseModel):
+    index: int
+    status_code: int
+    result: Optional[BunkeringResponse] = None
+    error: Optional[str] = None
+
+def operation_hours(request: BunkeringRequest) -> float:
+    try:
+        opening_datetime = datetime.strptime(request.opening_time, "%m/%d/%Y %H:%M")
+        closing_datetime = datetime.strptime(request.closing_time, "%m/%d/%Y %H:%M")
+    except ValueError:
+        raise CalculationError(400, "Invalid time format. Use MM/DD/YYYY HH:MM")
+    if closing_datetime <= opening_datetime:
+        raise CalculationError(400, "Closing time must be after opening time")
+    return (closing_datetime - opening_datetime).total_seconds() / 3600.0
+
+def bog_consumption(bog: float, hours: float, density: float) -> float:
+    """LNG boiled off at ``bog`` kg/h over ``hours``, in m3; scalars or arrays."""
+    return (bog * hours / density) / 1000.0
+
+def loaded_quantity(vol_diff: float, bog: float, hours: float, density: float, unreckoned: float) -> float:
+    """Custody-transfer loaded quantity: volume difference, plus BOG consumed, plus the unreckoned quantity.
+
+    The one formula behind /bunkering/calculate, the live session, the inverse
+    solver and the uncertainty samples; scalars or arrays.
+    """
+    return vol_diff + bog_consumption(bog, hours, density) + unreckoned
+
+def build_bunkering_response(
+    request: BunkeringRequest,
+    tank_ids: List[str],
+    total_volume1: float,
+    total_volume2: float,
+    total_volume3: float,
+    total_volume4: float,
+    difference_in_hours: float,
+) -> BunkeringResponse:
+    grand_total_volume_opening = total_volume1 + total_volume2
+    grand_total_volume_closing = total_volume3 + total_volume4
+    vol_diff = grand_total_volume_closing - grand_total_volume_opening
+    bog_cons = bog_consumption(request.bog, difference_in_hours, request.density)
+    total_loaded_qty = loaded_quantity(
+        vol_diff, request.bog, difference_in_hours, request.density, request.unreckoned_qty
+    )
+    net_qty = request.net_energy / (request.gross_energy / request.bdn_quantity)
+    diff = total_loaded_qty - net_qty
+
+    return BunkeringResponse(
+        ship_id=request.ship_id,
+        tank1_volume_opening=round(total_volume1, 2),
+        tank2_volume_opening=round(total_volume2, 2) if len(tank_ids) > 1 else None,
+        tank1_volume_closing=round(total_volume3, 2),
+        tank2_volume_closing=round(total_volume4, 2) if len(tank_ids) > 1 else None,
+        opening_quantity=round(grand_total_volume_opening, 2),
+        closing_quantity=round(grand_total_volume_closing, 2),
+        volume_difference=round(vol_diff, 2),
+        bog_consumption=round(bog_cons, 2),
+        loaded_quantity=round(total_loaded_qty, 2),
+        net_quantity=round(net_qty, 2),
+        difference=round(diff, 2),
+        calculation_time=datetime.now().isoformat(),
+    )
+
+# Tank slots of a request: (label, tank position, reading attribute, list/trim prefix)
+tank_slots = [
+    ("opening tank 1", 0, "opening_tank1", "opening"),
+    ("opening tank 2", 1, "opening_tank2", "opening"),
+    ("closing tank 1", 0, "closing_tank1", "closing"),
+    ("closing tank 2", 1, "closing_tank2", "closing"),
+]
+tank_fields = ["level", "vapor_temp", "liquid_temp", "pressure"]
+
+def reading_range_errors(request: BunkeringRequest) -> List[Dict[str, Any]]:
+    """Readings of a request outside its tanks' bounds index; checked before any interpolation.
+
+    Unknown ships or tanks whose tables fail to load return no errors here and
+    fail in the calculation itself, as before; tables that failed their
+    integrity check raise a 500 naming the problem.
+    """
+    try:
+        vessel = Vessel(request.ship_id)
+    except KeyError:
+        return []
+    errors: List[Dict[str, Any]] = []
+    for label, position, attr, phase in tank_slots:
+        reading = getattr(request, attr)
+        if position >= len(vessel.tanks) or reading is None:
+            continue
+        readings = {field: getattr(reading, field) for field in tank_fields}
+        readings["list"] = getattr(request, f"{phase}_list")
+        readings["trim"] = getattr(request, f"{phase}_trim")
+        try:
+            tank_errors = vessel.tanks[position].out_of_range(readings)
+        except TableError as e:
+            raise CalculationError(500, str(e))
+        except Exception:
+            continue
+        for error in tank_errors:
+            field = error["field"]
+            error["field"] = f"{phase}_{field}" if field in ("list", "trim") else f"{attr}.{field}"
+            error["tank"] = label
+            errors.append(error)
+    return errors
+
+def range_error_message(errors: List[Dict[str, Any]]) -> str:
+    return "Readings outside the calibration tables: " + "; ".join(
+        f"{e['field']}={e['value']} not in [{e['min']}, {e['max']}] ({e['tank']})" for e in errors
+    )
+
+def calculate_bunkering_many(requests: List[BunkeringRequest]) -> List[Any]:
+    """Vectorized calculate_bunkering over many requests, possibly for mixed ships.
+
+    Tank readings are grouped by (ship, tank) and each group is interpolated in
+    one call. Returns, in input order, a BunkeringResponse or the
+    CalculationError describing why that item failed.
+    """
+    results: List[Any] = [None] * len(requests)
+    hours: Dict[int, float] = {}
+    groups: Dict[Tuple[str, int], List[Tuple[int, int]]] = {}
+    for i, request in enumerate(requests):
+        try:
+            tank_ids = fleet.tank_ids(request.ship_id)
+            if tank_ids is None:
+                raise CalculationError(400, "Invalid ship ID")
+            hours[i] = operation_hours(request)
+            range_errors = reading_range_errors(request)
+            if range_errors:
+                raise CalculationError(422, range_error_message(range_errors))
+        except CalculationError as e:
+            hours.pop(i, None)
+            results[i] = e
+            continue
+        tank_count = len(tank_ids)
+        for slot, (_, position, attr, _) in enumerate(tank_slots):
+            if position < tank_count and getattr(request, attr) is not None:
+                groups.setdefault((request.ship_id, position), []).append((i, slot))
+
+    totals = {i: [None, 0.0, None, 0.0] for i in hours}
+    for (ship_id, position), rows in groups.items():
+        readings = [getattr(requests[i], tank_slots[slot][2]) for i, slot in rows]
+        phases = [tank_slots[slot][3] for _, slot in rows]
+        try:
+            tank = Vessel(ship_id).tanks[position]
+            quantities = compute_quantities(
+                tank,
+                [r.level for r in readings],
+                [getattr(requests[i], f"{phase}_list") for (i, _), phase in zip(rows, phases)],
+                [getattr(requests[i], f"{phase}_trim") for (i, _), phase in zip(rows, phases)],
+                [r.vapor_temp for r in readings],
+                [r.liquid_temp for r in readings],
+                [r.pressure for r in readings],
+                [requests[i].density for i, _ in rows],
+            )
+        except Exception:
+            continue
+        for (i, slot), volume in zip(rows, quantities["total_volume"].tolist()):
+            if not np.isnan(volume):
+                totals[i][slot] = volume
+
+    for i, slots in totals.items():
+        request = requests[i]
+        missing = [tank_slots[s][0] for s in (0, 2) if slots[s] is None]
+        if missing:
+            results[i] = CalculationError(500, f"Failed to compute corrected values for {missing[0]}")
+            continue
+        try:
+            with span("response", request.ship_id):
+                results[i] = build_bunkering_response(
+                    request, fleet.tank_ids(request.ship_id), *slots, hours[i]
+                )
+        except Exception as e:
+            results[i] = CalculationError(500, f"Calculation error: {str(e)}")
+    return results
+
+# Streaming bulk calculation
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "500"))
+
+response_columns = ["index", "status_code", "error"] + list(BunkeringResponse.model_fields)
+
+def unflatten_record(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a flat CSV row (``opening_tank1_level``, ...) into a BunkeringRequest payload."""
+    record: Dict[str, Any] = {k: v for k, v in row.items() if k and v not in (None, "")}
+    for _, _, attr, _ in tank_slots:
+        reading = {f: record.pop(f"{attr}_{f}") for f in tank_fields if f"{attr}_{f}" in record}
+        if reading:
+            record[attr] = reading
+    return record
+
+def iter_bunkering_results(records: Iterator[Any], chunk_rows: int = STREAM_CHUNK_ROWS) -> Iterator[BatchItemResult]:
+    """Evaluate records in chunks through calculate_bunkering_many, yielding results in order."""
+    index = 0
+    chunk: List[Any] = []
+
+    def flush() -> Iterator[BatchItemResult]:
+        outcomes: List[Any] = []
+        valid: List[BunkeringRequest] = []
+        for record in chunk:
+            if isinstance(record, CalculationError):
+                outcomes.append(record)
+                continue
+            try:
+                valid.append(BunkeringRequest.model_validate(record))
+                outcomes.append(None)
+            except ValidationError as e:
+                outcomes.append(CalculationError(422, str(e)))
+        calculated = iter(calculate_bunkering_many(valid))
+        for i, outcome in enumerate(outcomes):
+            outcome = next(calculated) if outcome is None else outcome
+            if isinstance(outcome, CalculationError):
+                yield BatchItemResult(index=index + i, status_code=outcome.status_code, error=str(outcome.detail))
+            else:
+                yield BatchItemResult(index=index + i, status_code=200, result=outcome)
+
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_rows:
+            yield from flush()
+            index += len(chunk)
+            chunk = []
+    if chunk:
+        yield from flush()
@@ -0,0 +1,759 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""Bunkering calculation engine, usable without the web stack.
+
+Holds the calibration table registry, the level/volume corrections and the
+vapour-space formula behind a small object model, so CLIs and batch workers
+can compute tank quantities without importing FastAPI, pydantic or uvicorn:
+
+    from engine import Vessel, compute_quantities
+
+    vessel = Vessel("MOUNT TAI")
+    quantities = compute_quantities(
+        vessel.tanks[0], level, list_, trim_, vapor_temp, liquid_temp, pressure, density
+    )
+
+Only NumPy is imported up front; pandas (CSV fallback when no compiled bundle
+is present) and SciPy (INTERP_ENGINE=scipy) are imported on first use.
+"""
+
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fleet import FleetRegistry, TankSpec
+from interpolation import make_interpolator
+from observability import get_logger, span
+from tables import Table, TableError, inspect_table, load_table, stored_report
+
+logger = get_logger("engine")
+
+# Directories
+base_dir = os.path.dirname(os.path.abspath(__file__))
+ship_dir = os.path.join(base_dir, "DATA")
+
+# Fleet manifest (DATA/fleet.json): ships, tanks, capacities and tank families
+fleet = FleetRegistry()
+
+# Calibration tables
+def get_tank_data_path(ship_id: str, tank_id: str) -> Dict[str, str]:
+    tank = fleet.tank(ship_id, tank_id)
+    if tank is None:
+        return {}
+    ship_data_dir = os.path.join(ship_dir, ship_id)
+    return {name: os.path.join(ship_data_dir, f"{name}_{tank_id}.csv") for name in tank.tables}
+
+def tank_table_paths(ship_id: str, tank_id: str) -> Dict[str, str]:
+    """get_tank_data_path plus the tank's optional liquid temperature/pressure correction curves."""
+    paths = get_tank_data_path(ship_id, tank_id)
+    if paths:
+        ship_data_dir = os.path.join(ship_dir, ship_id)
+        for name in ("tempcorr_table", "presscorr_table"):
+            path = os.path.join(ship_data_dir, f"{name}_{tank_id}.csv")
+            if os.path.exists(path):
+                paths[name] = path
+    return paths
+
+def check_tank_tables(spec: TankSpec, paths: Dict[str, str], use_bundles: bool = True, read_csv: bool = True):
+    """Integrity reports of a tank's tables, plus the checks across them.
+
+    Returns (report per table, tables read while checking, errors). Only the
+    reports are needed, so a tank with fresh bundles reads just their index.
+    With ``read_csv`` off no CSV is parsed: tables without a fresh bundle are
+    only checked to exist, and load_table checks them when they are loaded.
+    """
+    reports: Dict[str, Dict[str, Any]] = {}
+    loaded: Dict[str, Table] = {}
+    errors: List[str] = []
+    for name, path in paths.items():
+        if not os.path.exists(path):
+            reports[name] = {"shape": None, "errors": ["file is missing"], "warnings": []}
+        elif read_csv:
+            reports[name], table = inspect_table(path, name, use_bundles)
+            if table is not None and not reports[name]["errors"]:
+                loaded[name] = table
+        else:
+            report = stored_report(path) if use_bundles else None
+            if report is None:
+                continue
+            reports[name] = report
+        errors.extend(f"{os.path.basename(path)}: {e}" for e in reports[name]["errors"])
+    # Grids other than "list_trim" ones are evaluated on the volume table's level rows
+    volume_shape = reports.get("volume_table", {}).get("shape")
+    if spec.family != "list_trim" and volume_shape:
+        for name, report in reports.items():
+            shape = report["shape"] or []
+            if len(shape) == 2 and shape[0] != volume_shape[0]:
+                errors.append(
+                    f"{os.path.basename(paths[name])}: {shape[0]} level rows, the volume table has {volume_shape[0]}"
+                )
+    return reports, loaded, errors
+
+# Calibration table registry
+TABLE_CACHE_SIZE = int(os.getenv("TABLE_CACHE_SIZE", "128"))
+
+INTERP_ENGINE = os.getenv("INTERP_ENGINE", "numpy")  # "scipy" restores RegularGridInterpolator
+INTERP_UNIFORM = os.getenv("INTERP_UNIFORM", "1") == "1"  # index arithmetic on evenly spaced axes
+
+def _grid_interpolator(level_values: np.ndarray, table: Table, engine: Optional[str] = None):
+    return make_interpolator(level_values, table.y, table.values, engine=engine or INTERP_ENGINE, uniform=INTERP_UNIFORM)
+
+def _curve_interpolator(table: Table, engine: Optional[str] = None):
+    return make_interpolator(table.x, table.values, engine=engine or INTERP_ENGINE, uniform=INTERP_UNIFORM)
+
+def _bounds(axis: np.ndarray) -> Tuple[float, float]:
+    return float(axis[0]), float(axis[-1])
+
+# Every compiled TankTables gets a new version, so results memoized against
+# replaced tables can never be served again
+_table_versions = itertools.count(1)
+
+class TankTables:
+    """Interpolators for one (ship, tank), each compiled once from its calibration tables.
+
+    Construction only runs the cheap part of the integrity precheck
+    (``check_tank_tables`` without reading CSVs): files exist and the reports
+    stored in fresh bundles pass. A table without a bundle is checked by
+    load_table when it is first loaded, and its level rows against the volume
+    table's then; both raise TableError before any interpolator sees the data.
+    Every table is loaded, and every interpolator and bounds index built, the
+    first time it is used, then kept as a plain attribute so later lookups
+    cost nothing (see ``__getattr__``).
+    ``load_all()`` forces everything, e.g. to validate a reload. ``engine``
+    and ``use_bundles`` override INTERP_ENGINE and the compiled bundles, e.g.
+    to rebuild the original SciPy-over-CSV path as a reference.
+    """
+
+    def __init__(self, ship_id: str, tank_id: str, engine: Optional[str] = None, use_bundles: bool = True):
+        self.ship_id = ship_id
+        self.tank_id = tank_id
+        self.version = next(_table_versions)
+        self.engine = engine
+        self.use_bundles = use_bundles
+        self.spec = fleet.tank(ship_id, tank_id)
+        if self.spec is None:
+            raise KeyError(f"Unknown tank {tank_id} for ship {ship_id}")
+        self.paths = tank_table_paths(ship_id, tank_id)
+        self._lock = threading.RLock()
+        self.tables: Dict[str, Table] = {}
+        _, _, errors = check_tank_tables(self.spec, self.paths, use_bundles, read_csv=False)
+        if errors:
+            raise TableError(f"Calibration tables of {ship_id} {tank_id} failed validation: " + "; ".join(errors))
+
+    def __getattr__(self, name: str):
+        # Only called for attributes not built yet; _build_<name> makes them
+        builder = getattr(type(self), f"_build_{name}", None)
+        if builder is None:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        with self._lock:
+            if name not in self.__dict__:
+                self.__dict__[name] = builder(self)
+        return self.__dict__[name]
+
+    def table(self, name: str) -> Table:
+        with self._lock:
+            table = self.tables.get(name)
+            if table is None:
+                with span("table_load", self.ship_id, self.spec.family):
+                    table = load_table(self.paths[name], name, self.use_bundles)
+                self._check_level_rows(name, table)
+                self.tables[name] = table
+        return table
+
+    def _check_level_rows(self, name: str, table: Table) -> None:
+        # As in check_tank_tables: grids other than "list_trim" ones are
+        # evaluated on the volume table's level rows
+        if self.spec.family == "list_trim" or table.y is None or name == "volume_table" or "volume_table" not in self.paths:
+            return
+        rows = len(self.table("volume_table").x)
+        if len(table.x) != rows:
+            raise TableError(
+                f"Calibration tables of {self.ship_id} {self.tank_id} failed validation: "
+                f"{os.path.basename(self.paths[name])}: {len(table.x)} level rows, the volume table has {rows}"
+            )
+
+    def load_all(self) -> "TankTables":
+        for name in self.paths:
+            self.table(name)
+        for name in vars(type(self)):
+            if name.startswith("_build_"):
+                getattr(self, name[len("_build_"):])
+        return self
+
+    def _level_values(self, table: Table) -> np.ndarray:
+        # "list_trim" tables carry their own level rows; the others share the volume table's
+        if self.spec.family == "list_trim":
+            return table.x
+        return self.table("volume_table").x
+
+    def _build_list_interpolator(self):
+        list_table = self.table("list_table")
+        return _grid_interpolator(self._level_values(list_table), list_table, self.engine)
+
+    def _build_trim_interpolator(self):
+        trim_table = self.table("trim_table")
+        return _grid_interpolator(self._level_values(trim_table), trim_table, self.engine)
+
+    def _build_volume_interpolator(self):
+        if self.spec.family == "list_trim":
+            return None
+        return _curve_interpolator(self.table("volume_table"), self.engine)
+
+    def _build_temp_interpolator(self):
+        if self.spec.family != "full":
+            return None
+        return _grid_interpolator(self.table("volume_table").x, self.table("temp_table"), self.engine)
+
+    def _build_press_interpolator(self):
+        if self.spec.family != "full":
+            return None
+        return _grid_interpolator(self.table("volume_table").x, self.table("press_table"), self.engine)
+
+    def _build_tempcorr_interpolator(self):
+        if "tempcorr_table" not in self.paths:
+            return None
+        return _curve_interpolator(self.table("tempcorr_table"), self.engine)
+
+    def _build_presscorr_interpolator(self):
+        if "presscorr_table" not in self.paths:
+            return None
+        return _curve_interpolator(self.table("presscorr_table"), self.engine)
+
+    def _build_bounds(self) -> Dict[str, Tuple[float, float]]:
+        # Bounds index: the domain of every reading an interpolator looks up
+        # directly, keyed by request field, so bad input is rejected up front
+        bounds = {
+            "level": _bounds(self.list_interpolator.grid[0]),
+            "list": _bounds(self.list_interpolator.grid[1]),
+            "trim": _bounds(self.trim_interpolator.grid[1]),
+        }
+        if self.temp_interpolator is not None:
+            bounds["vapor_temp"] = _bounds(self.temp_interpolator.grid[1])
+            bounds["pressure"] = _bounds(self.press_interpolator.grid[1])
+        return bounds
+
+    def _build_correction_bounds(self) -> Dict[str, Tuple[float, float]]:
+        bounds = {}
+        if self.tempcorr_interpolator is not None:
+            bounds["liquid_temp"] = _bounds(self.tempcorr_interpolator.grid[0])
+        if self.presscorr_interpolator is not None:
+            bounds["pressure"] = _bounds(self.presscorr_interpolator.grid[0])
+        return bounds
+
+    def _build_axis_warnings(self) -> List[str]:
+        # Level columns that differ from the volume table's, which are used instead
+        warnings: List[str] = []
+        if self.spec.family == "list_trim" or "volume_table" not in self.paths:
+            return warnings
+        level = np.asarray(self.table("volume_table").x)
+        for name in self.paths:
+            table = self.table(name)
+            if table.y is None:
+                continue
+            differ = np.nonzero(np.asarray(table.x) != level)[0]
+            if len(differ):
+                warnings.append(
+                    f"{os.path.basename(self.paths[name])}: level column differs from the volume table's "
+                    f"in {len(differ)} rows (by up to {np.abs(table.x[differ] - level[differ]).max():g}); "
+                    "the volume table's levels are used"
+                )
+        return warnings
+
+    @property
+    def has_corrections(self) -> bool:
+        return "tempcorr_table" in self.paths or "presscorr_table" in self.paths
+
+    def correct(self, level: float, list_: float, trim_: float, temp_: float, press_: float):
+        list_correction = self.list_interpolator.at(level, list_)
+        if self.volume_interpolator is None:
+            corrected_level = level + list_correction
+            return corrected_level, self.trim_interpolator.at(corrected_level, trim_)
+
+        corrected_level = level + list_correction + self.trim_interpolator.at(level, trim_)
+        if self.temp_interpolator is not None:
+            corrected_level += self.temp_interpolator.at(level, temp_)
+            corrected_level += self.press_interpolator.at(level, press_)
+        return corrected_level, self.volume_interpolator.at(corrected_level)
+
+    def temp_corr(self, temp_value: float) -> float:
+        if self.tempcorr_interpolator is None:
+            return 1.0
+        return self.tempcorr_interpolator.at(temp_value)
+
+    def press_corr(self, press_value: float) -> float:
+        if self.presscorr_interpolator is None:
+            return 1.0
+        return self.presscorr_interpolator.at(press_value)
+
+    # Vectorized variants: out-of-range points come back as NaN instead of raising
+    def correct_many(self, level, list_, trim_, temp_, press_):
+        level = np.asarray(level, dtype=float)
+        list_correction = self.list_interpolator.evaluate(level, list_)
+        if self.volume_interpolator is None:
+            corrected_level = level + list_correction
+            return corrected_level, self.trim_interpolator.evaluate(corrected_level, trim_)
+
+        corrected_level = level + list_correction + self.trim_interpolator.evaluate(level, trim_)
+        if self.temp_interpolator is not None:
+            corrected_level += self.temp_interpolator.evaluate(level, temp_)
+            corrected_level += self.press_interpolator.evaluate(level, press_)
+        return corrected_level, self.volume_interpolator.evaluate(corrected_level)
+
+    def temp_corr_many(self, temp_values) -> np.ndarray:
+        if self.tempcorr_interpolator is None:
+            return np.ones(np.shape(temp_values))
+        return self.tempcorr_interpolator.evaluate(temp_values)
+
+    def press_corr_many(self, press_values) -> np.ndarray:
+        if self.presscorr_interpolator is None:
+            return np.ones(np.shape(press_values))
+        return self.presscorr_interpolator.evaluate(press_values)
+
+# Corrected-value memoization
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "65536"))  # 0 disables
+# Unset: exact readings are the key. Set: readings are rounded to that many
+# decimals first, which can move a result across a 0.01 rounding boundary
+RESULT_CACHE_DECIMALS: Optional[int] = (
+    int(os.environ["RESULT_CACHE_DECIMALS"]) if os.getenv("RESULT_CACHE_DECIMALS") else None
+)
+
+class ResultCache:
+    """LRU of (corrected_level, corrected_volume) per tank reading.
+
+    Keys are (ship_id, tank_id, table version, readings). With ``decimals``
+    set the readings are rounded first, and the rounded readings are also what
+    gets computed, so a result never depends on which nearby reading happened
+    to be cached first.
+    """
+
+    def __init__(self, maxsize: int = RESULT_CACHE_SIZE, decimals: Optional[int] = RESULT_CACHE_DECIMALS):
+        self.maxsize = maxsize
+        self.decimals = decimals
+        self._results: "OrderedDict[tuple, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def quantise(self, *readings: float) -> Tuple[float, ...]:
+        if self.decimals is None:
+            return tuple(float(v) for v in readings)
+        return tuple(round(float(v), self.decimals) for v in readings)
+
+    def get(self, key: tuple) -> Optional[Tuple[float, float]]:
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: tuple, result: Tuple[float, float]) -> None:
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+
+    def invalidate(self, ship_id: str, tank_id: Optional[str] = None) -> None:
+        with self._lock:
+            stale = [k for k in self._results if k[0] == ship_id and (tank_id is None or k[1] == tank_id)]
+            for key in stale:
+                del self._results[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._results),
+                "maxsize": self.maxsize,
+                "decimals": self.decimals,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+class TableRegistry:
+    """Process-wide LRU of compiled TankTables keyed by (ship_id, tank_id).
+
+    ``generation`` goes up whenever tables are reloaded or dropped, so other
+    processes holding their own registry (calculation pool workers) can tell
+    that their copies are stale.
+    """
+
+    def __init__(self, maxsize: int = TABLE_CACHE_SIZE, results: Optional[ResultCache] = None):
+        self.maxsize = maxsize
+        self.results = results if results is not None else ResultCache()
+        self.generation = 0
+        # Why the last reload of a tank failed, until one succeeds
+        self.reload_errors: Dict[Tuple[str, str], str] = {}
+        self._tables: "OrderedDict[Tuple[str, str], TankTables]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, ship_id: str, tank_id: str) -> TankTables:
+        key = (ship_id, tank_id)
+        with self._lock:
+            tables = self._tables.get(key)
+            if tables is not None:
+                self._tables.move_to_end(key)
+                self.hits += 1
+                return tables
+            self.misses += 1
+
+        # Tables load lazily, per table, on first use (outside this lock)
+        tables = TankTables(ship_id, tank_id)
+        with self._lock:
+            self._tables[key] = tables
+            self._tables.move_to_end(key)
+            while len(self._tables) > self.maxsize:
+                self._tables.popitem(last=False)
+        return tables
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tables.clear()
+            self.generation += 1
+        self.results.clear()
+
+    def reload(self, ship_id: str, tank_id: str) -> bool:
+        """Recompile a cached tank and swap it in; False leaves the old tables in place."""
+        key = (ship_id, tank_id)
+        with self._lock:
+            if key not in self._tables:
+                # Not loaded here, but pool workers may hold it
+                self.generation += 1
+                return True
+        tank_paths = get_tank_data_path(ship_id, tank_id)
+        if not tank_paths or not all(os.path.exists(p) for p in tank_paths.values()):
+            with self._lock:
+                self._tables.pop(key, None)
+                self.generation += 1
+            self.results.invalidate(ship_id, tank_id)
+            return True
+        try:
+            # Loaded in full here, so a bad replacement is caught before the swap
+            tables = TankTables(ship_id, tank_id).load_all()
+        except Exception as e:
+            logger.warning(
+                "Table reload failed, keeping previous tables",
+                extra={"ship_id": ship_id, "tank_id": tank_id, "error": str(e)},
+            )
+            self.reload_errors[key] = str(e)
+            return False
+        with self._lock:
+            if key in self._tables:
+                self._tables[key] = tables
+            self.generation += 1
+        self.reload_errors.pop(key, None)
+        self.results.invalidate(ship_id, tank_id)
+        return True
+
+    def invalidate_ships(self, ship_ids: List[str]) -> None:
+        ships = set(ship_ids)
+        with self._lock:
+            for key in [k for k in self._tables if k[0] in ships]:
+                del self._tables[key]
+            self.generation += 1
+        for ship_id in ships:
+            self.results.invalidate(ship_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            loaded = list(self._tables.values())
+            stats = {
+                "size": len(loaded),
+                "maxsize": self.maxsize,
+                "generation": self.generation,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+        # Mapped grids live in the page cache and are shared by every worker;
+        # private ones (CSV fallback) are paid for once per worker
+        tables = [t for tank in loaded for t in list(tank.tables.values())]
+        stats["bytes_mapped"] = sum(t.nbytes for t in tables if t.mapped)
+        stats["bytes_private"] = sum(t.nbytes for t in tables if not t.mapped)
+        return stats
+
+table_registry = TableRegistry()
+fleet.on_change.append(table_registry.invalidate_ships)
+
+class PinnedTables:
+    """Registry stand-in serving a fixed set of TankTables.
+
+    A long-lived consumer (a live session) builds its Vessel on one of these so
+    every lookup sees the tables it started with, whatever reloads happen in
+    the shared registry meanwhile.
+    """
+
+    def __init__(self, tables: Dict[Tuple[str, str], TankTables], results: ResultCache):
+        self._tables = tables
+        self.results = results
+
+    def get(self, ship_id: str, tank_id: str) -> TankTables:
+        return self._tables[(ship_id, tank_id)]
+
+# Table integrity report
+def validate_tank(ship_id: str, tank_id: str) -> Dict[str, Any]:
+    """Integrity report of one tank's tables, as served by /ships/{ship_id}/validate."""
+    spec = fleet.tank(ship_id, tank_id)
+    if spec is None:
+        raise KeyError(f"Unknown tank {tank_id} for ship {ship_id}")
+    paths = tank_table_paths(ship_id, tank_id)
+    reports, _, errors = check_tank_tables(spec, paths)
+    warnings = [f"{os.path.basename(paths[name])}: {w}" for name, r in reports.items() for w in r["warnings"]]
+    if not errors:
+        try:
+            warnings.extend(table_registry.get(ship_id, tank_id).axis_warnings)
+        except TableError as e:
+            errors.append(str(e))
+    return {
+        "family": spec.family,
+        "valid": not errors,
+        "errors": errors,
+        "warnings": warnings,
+        "tables": {
+            name: {
+                "file": os.path.basename(paths[name]),
+                "fingerprint": report.get("fingerprint"),
+                "shape": report["shape"],
+                "errors": report["errors"],
+                "warnings": report["warnings"],
+            }
+            for name, report in reports.items()
+        },
+    }
+
+# Quantities
+def tank_volumes(corrected_volume, temp_corr, press_corr, vapor_temp, pressure, capacity, density):
+    # Liquid volume and the liquid equivalent of the vapour space; works on scalars or arrays
+    liquid_volume = corrected_volume * temp_corr * press_corr
+    vap_corr = (273 + 15) / (273 + vapor_temp) * (1.013 + pressure) / 1.013 * 0.6785
+    vnet = capacity - liquid_volume
+    vnet_corr = vnet * vap_corr
+    vap_volume = vnet_corr / density / 1000.0
+    return liquid_volume, vap_volume
+
+def tank_total_volume(corrected_volume, temp_corr, press_corr, vapor_temp, pressure, capacity, density):
+    liquid_volume, vap_volume = tank_volumes(
+        corrected_volume, temp_corr, press_corr, vapor_temp, pressure, capacity, density
+    )
+    return liquid_volume + vap_volume
+
+# Object model
+class Tank:
+    """One tank of a Vessel: its fleet spec plus the cached calibration tables."""
+
+    def __init__(self, vessel: "Vessel", spec: TankSpec):
+        self.vessel = vessel
+        self.spec = spec
+        self.tank_id = spec.tank_id
+        self.position = spec.position
+        self.capacity = spec.capacity
+
+    @property
+    def tables(self) -> TankTables:
+        return self.vessel.registry.get(self.vessel.ship_id, self.tank_id)
+
+    def correction_tables(self) -> Optional[TankTables]:
+        """Liquid temperature/pressure curves: the tank's own when it has them, else the vessel's."""
+        tables = self.tables
+        if tables.has_corrections:
+            return tables
+        return self.vessel.correction_tables()
+
+    @property
+    def bounds(self) -> Dict[str, Tuple[float, float]]:
+        """Accepted range per reading: this tank's grids plus its correction curves."""
+        bounds = dict(self.tables.bounds)
+        correction_tables = self.correction_tables()
+        if correction_tables is not None:
+            for field, (low, high) in correction_tables.correction_bounds.items():
+                if field in bounds:
+                    low, high = max(low, bounds[field][0]), min(high, bounds[field][1])
+                bounds[field] = (low, high)
+        return bounds
+
+    def out_of_range(self, readings: Dict[str, float]) -> List[Dict[str, Any]]:
+        """Readings (keyed like ``bounds``) that fall outside the tables."""
+        bounds = self.bounds
+        errors = []
+        for field, value in readings.items():
+            if field in bounds and not bounds[field][0] <= value <= bounds[field][1]:
+                errors.append({"field": field, "value": value, "min": bounds[field][0], "max": bounds[field][1]})
+        return errors
+
+    def correct(self, level: float, list_: float, trim_: float, temp_: float, press_: float) -> Tuple[float, float]:
+        """Corrected level and volume rounded to 2 dp; ValueError outside the tables.
+
+        Memoized in the registry's ResultCache when it is enabled.
+        """
+        tables = self.tables
+        results = self.vessel.registry.results
+        if results.enabled:
+            level, list_, trim_, temp_, press_ = results.quantise(level, list_, trim_, temp_, press_)
+            # Temperature and pressure only move the level of "full" tanks
+            readings = (level, list_, trim_, temp_, press_) if tables.temp_interpolator is not None else (level, list_, trim_)
+            key = (self.vessel.ship_id, self.tank_id, tables.version) + readings
+            cached = results.get(key)
+            if cached is not None:
+                return cached
+        with span("interpolation", self.vessel.ship_id, self.spec.family):
+            corrected_level, corrected_volume = tables.correct(level, list_, trim_, temp_, press_)
+        result = (round(corrected_level, 2), round(corrected_volume, 2))
+        if results.enabled:
+            results.put(key, result)
+        return result
+
+    def total_volume(
+        self, corrected_volume: float, liquid_temp: float, vapor_temp: float, pressure: float, density: float
+    ) -> float:
+        ship_id, family = self.vessel.ship_id, self.spec.family
+        with span("correction", ship_id, family):
+            correction_tables = self.correction_tables()
+            if correction_tables is not None:
+                temp_corr = correction_tables.temp_corr(liquid_temp)
+                press_corr = correction_tables.press_corr(pressure)
+            else:
+                temp_corr = press_corr = 1.0
+        with span("vapour", ship_id, family):
+            return float(tank_total_volume(
+                corrected_volume, temp_corr, press_corr, vapor_temp, pressure, self.capacity, density
+            ))
+
+class Vessel:
+    """A ship of the fleet manifest and its tanks."""
+
+    def __init__(self, ship_id: str, registry: Optional[Any] = None):
+        spec = fleet.ship(ship_id)
+        if spec is None:
+            raise KeyError(f"Unknown ship ID: {ship_id}")
+        self.ship_id = ship_id
+        self.spec = spec
+        self.registry = registry or table_registry
+        self.tanks = [Tank(self, tank) for tank in spec.tanks]
+        self.tank_ids = spec.tank_ids
+
+    def tank(self, tank_id: str) -> Optional[Tank]:
+        for tank in self.tanks:
+            if tank.tank_id == tank_id:
+                return tank
+        return None
+
+    def correction_tables(self) -> Optional[TankTables]:
+        # Vessel-level liquid temperature/pressure curves: the first tank's, used
+        # by tanks that have none of their own
+        try:
+            return self.registry.get(self.ship_id, self.tank_ids[0])
+        except Exception as e:
+            logger.warning(
+                "Correction tables unavailable, defaulting to 1.0",
+                extra={"ship_id": self.ship_id, "error": str(e)},
+            )
+            return None
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    # Python round() per element, matching the scalar path exactly. rint(v * 100) / 100
+    # gives the same double except where v * 100 lands within rounding error of a
+    # half-cent (or is too large for that error bound); only those go through round()
+    values = np.asarray(values, dtype=float)
+    scaled = values * 100.0
+    out = np.rint(scaled) / 100.0
+    exact = (np.abs(np.abs(np.modf(scaled)[0]) - 0.5) < 1e-6) | (np.abs(scaled) >= 1e9)
+    if exact.any():
+        out[exact] = [round(v, 2) for v in values[exact].tolist()]
+    return out
+
+def compute_quantities(
+    tank: Tank, level, list_, trim_, vapor_temp, liquid_temp, pressure, density
+) -> Dict[str, np.ndarray]:
+    """Vectorized quantities for many readings of one tank.
+
+    Inputs broadcast against each other. Returns ``corrected_level`` and
+    ``corrected_volume`` (rounded to 2 dp like the scalar path),
+    ``liquid_volume`` (temperature/pressure corrected), ``vapour_volume`` (the
+    liquid equivalent of the vapour space) and their sum ``total_volume``;
+    readings outside the calibration tables come back as NaN.
+    """
+    level, list_, trim_, vapor_temp, liquid_temp, pressure, density = np.broadcast_arrays(
+        *(np.asarray(v, dtype=float) for v in (level, list_, trim_, vapor_temp, liquid_temp, pressure, density))
+    )
+    ship_id, family = tank.vessel.ship_id, tank.spec.family
+    tables = tank.tables
+    with span("interpolation", ship_id, family):
+        corrected_level, corrected_volume = tables.correct_many(level, list_, trim_, vapor_temp, pressure)
+        corrected_level = _round2(corrected_level)
+        corrected_volume = _round2(corrected_volume)
+
+    with span("correction", ship_id, family):
+        correction_tables = tank.correction_tables()
+        if correction_tables is not None:
+            temp_corr = correction_tables.temp_corr_many(liquid_temp)
+            press_corr = correction_tables.press_corr_many(pressure)
+        else:
+            temp_corr = press_corr = np.ones(level.shape)
+
+    with span("vapour", ship_id, family):
+        liquid_volume, vapour_volume = tank_volumes(
+            corrected_volume, temp_corr, press_corr, vapor_temp, pressure, tank.capacity, density
+        )
+    return {
+        "corrected_level": corrected_level,
+        "corrected_volume": corrected_volume,
+        "liquid_volume": liquid_volume,
+        "vapour_volume": vapour_volume,
+        "total_volume": liquid_volume + vapour_volume,
+    }
+
+def _reaching(totals: np.ndarray, target: float) -> int:
+    # First index whose running-max total reaches target (NaN never does)
+    envelope = np.maximum.accumulate(np.where(np.isnan(totals), -np.inf, totals))
+    return int(np.searchsorted(envelope, target, side="left"))
+
+def solve_level(
+    tank: Tank, target_volume: float, list_, trim_, vapor_temp, liquid_temp, pressure, density,
+    refine: int = 3, samples: int = 33,
+) -> float:
+    """Lowest sounding at which the tank's total volume reaches ``target_volume``.
+
+    Inverse of compute_quantities for fixed conditions: the total volume is
+    evaluated over the tank's whole level axis in one call and the first node
+    reaching the target brackets the answer; the bracket is then narrowed by
+    evaluating ``samples`` levels across it ``refine`` times (a 10 mm cell
+    ends up ~0.0003 mm wide). Raises ValueError when the target is outside
+    what the tables give under these conditions.
+    """
+    conditions = (list_, trim_, vapor_temp, liquid_temp, pressure, density)
+    levels = np.asarray(tank.tables.list_interpolator.grid[0], dtype=float)
+    totals = compute_quantities(tank, levels, *conditions)["total_volume"]
+    finite = totals[~np.isnan(totals)]
+    if not len(finite):
+        raise ValueError(f"No sounding of tank {tank.tank_id} is within the tables under these conditions")
+    low_total, high_total = float(finite[0]), float(finite.max())
+    if not low_total <= target_volume <= high_total:
+        raise ValueError(
+            f"Target volume {target_volume:.2f} m3 for tank {tank.tank_id} is outside "
+            f"[{low_total:.2f}, {high_total:.2f}] under these conditions"
+        )
+    k = _reaching(totals, target_volume)
+    if k == 0:
+        return float(levels[0])
+    low, high = float(levels[k - 1]), float(levels[k])
+    for _ in range(refine):
+        points = np.linspace(low, high, samples)
+        j = min(max(_reaching(compute_quantities(tank, points, *conditions)["total_volume"], target_volume), 1), samples - 1)
+        low, high = float(points[j - 1]), float(points[j])
+    return high
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""Fleet manifest: ships, tank capacities, BOG limits and tank families.
+
+The manifest lives in ``DATA/fleet.json`` next to the calibration tables, so
+onboarding a hull is a data change: add its table directory and a ``ships``
+entry (plus a ``ship_classes`` entry for a new class). The file is indexed
+into dictionaries once and re-read when its mtime changes.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from observability import get_logger
+
+logger = get_logger("fleet")
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+FLEET_MANIFEST = os.getenv("FLEET_MANIFEST", os.path.join(base_dir, "DATA", "fleet.json"))
+FLEET_RELOAD_INTERVAL = float(os.getenv("FLEET_RELOAD_INTERVAL", "5"))
+
+class TankSpec:
+    __slots__ = ("tank_id", "position", "family", "capacity", "tables", "level_table", "temp_range", "press_range")
+
+    def __init__(self, tank_id: str, position: int, spec: Dict[str, Any], family: Dict[str, Any]):
+        self.tank_id = tank_id
+        self.position = position
+        self.family: str = spec["family"]
+        self.capacity: float = spec["capacity"]
+        self.tables: List[str] = list(spec.get("tables", family["tables"]))
+        self.level_table: str = spec.get("level_table", family["level_table"])
+        self.temp_range: Optional[Tuple[float, float]] = _range(spec.get("temp_range", family.get("temp_range")))
+        self.press_range: Optional[Tuple[float, float]] = _range(spec.get("press_range", family.get("press_range")))
+
+class ShipSpec:
+    __slots__ = ("ship_id", "identity", "bog_max", "tanks", "tank_ids", "_by_id")
+
+    def __init__(self, ship_id: str, identity: str, ship_class: Dict[str, Any], families: Dict[str, Any]):
+        self.ship_id = ship_id
+        self.identity = identity
+        self.bog_max = ship_class["BOG_max"]
+        self.tanks = [
+            TankSpec(tank_id, position, spec, families[spec["family"]])
+            for position, (tank_id, spec) in enumerate(ship_class["tanks"].items())
+        ]
+        self.tank_ids = [tank.tank_id for tank in self.tanks]
+        self._by_id = {tank.tank_id: tank for tank in self.tanks}
+
+    def tank(self, tank_id: str) -> Optional[TankSpec]:
+        return self._by_id.get(tank_id)
+
+    def parameters(self) -> Dict[str, Any]:
+        # Legacy get_ship_parameters() shape: BOG_max, LNG_TK<n>_cap, identity
+        params: Dict[str, Any] = {"BOG_max": self.bog_max}
+        for tank in self.tanks:
+            params[f"LNG_TK{tank.position + 1}_cap"] = tank.capacity
+        params["identity"] = self.identity
+        return params
+
+def _range(value) -> Optional[Tuple[float, float]]:
+    return (float(value[0]), float(value[1])) if value else None
+
+def parse_manifest(manifest: Dict[str, Any]) -> Dict[str, ShipSpec]:
+    families = manifest["tank_families"]
+    classes = manifest["ship_classes"]
+    return {
+        ship_id: ShipSpec(ship_id, identity, classes[identity], families)
+        for ship_id, identity in manifest["ships"].items()
+    }
+
+class FleetRegistry:
+    """O(1) ship/tank lookups over the manifest, refreshed when the file changes."""
+
+    def __init__(self, path: str = FLEET_MANIFEST, reload_interval: float = FLEET_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.on_change: List[Callable[[List[str]], None]] = []
+        self._lock = threading.Lock()
+        self._ships: Dict[str, ShipSpec] = {}
+        self._raw: Dict[str, Any] = {}
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._checked = 0.0
+        self.loaded_at: Optional[float] = None
+        self.reload(force=True)
+
+    @property
+    def modified_at(self) -> float:
+        """mtime of the loaded manifest (epoch seconds)."""
+        return self._stamp[0] / 1e9 if self._stamp else 0.0
+
+    def _file_stamp(self) -> Tuple[int, int]:
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def reload(self, force: bool = False) -> List[str]:
+        """Re-read the manifest if it changed; returns the ship IDs whose spec changed."""
+        with self._lock:
+            self._checked = time.monotonic()
+            stamp = self._file_stamp()
+            if not force and stamp == self._stamp:
+                return []
+            with open(self.path) as f:
+                raw = json.load(f)
+            ships = parse_manifest(raw)
+
+            old = self._raw
+            changed = [
+                ship_id for ship_id in sorted(set(ships) | set(self._ships))
+                if _ship_entry(raw, ship_id) != _ship_entry(old, ship_id)
+            ]
+            # Swap the whole index at once; readers never see a partial manifest
+            self._ships, self._raw, self._stamp = ships, raw, stamp
+            self.loaded_at = time.time()
+        if old and changed:
+            for callback in self.on_change:
+                callback(changed)
+        return changed
+
+    def refresh(self) -> None:
+        if time.monotonic() - self._checked < self.reload_interval:
+            return
+        try:
+            self.reload()
+        except (OSError, ValueError, KeyError) as e:
+            # Keep serving the last good manifest
+            logger.warning("Fleet manifest reload failed, keeping previous version", extra={"error": str(e)})
+
+    def ship(self, ship_id: str) -> Optional[ShipSpec]:
+        self.refresh()
+        return self._ships.get(ship_id)
+
+    def tank(self, ship_id: str, tank_id: str) -> Optional[TankSpec]:
+        ship = self.ship(ship_id)
+        return ship.tank(tank_id) if ship else None
+
+    def tank_ids(self, ship_id: str) -> Optional[List[str]]:
+        ship = self.ship(ship_id)
+        return ship.tank_ids if ship else None
+
+    def ship_ids(self) -> List[str]:
+        self.refresh()
+        return list(self._ships)
+
+    def __contains__(self, ship_id: str) -> bool:
+        return self.ship(ship_id) is not None
+
+def _ship_entry(raw: Dict[str, Any], ship_id: str) -> Any:
+    if not raw:
+        return None
+    identity = raw.get("ships", {}).get(ship_id)
+    if identity is None:
+        return None
+    ship_class = raw["ship_classes"].get(identity, {})
+    families = {spec.get("family") for spec in ship_class.get("tanks", {}).values()}
+    return identity, ship_class, {f: raw["tank_families"].get(f) for f in families}
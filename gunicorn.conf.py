@@ -0,0 +1,18 @@
+# coding: utf-8
+
+"""gunicorn settings: gunicorn -c gunicorn.conf.py api:app
+
+preload_app imports api.py once in the master; with PRELOAD_TABLES=1 that
+loads every calibration table before the workers are forked, so they share
+the compiled grids (memory-mapped bundles) and the interpolator objects
+instead of each worker loading its own copy.
+"""
+
+import os
+
+os.environ.setdefault("PRELOAD_TABLES", "1")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
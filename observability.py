@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""Structured logging and Prometheus-style metrics, stdlib only.
+
+Logging goes through the ``bunkering`` logger tree. LOG_LEVEL (default INFO)
+sets the threshold; messages below it are dropped by ``logging`` before they
+are formatted, so per-request DEBUG detail costs nothing unless it is turned
+on. LOG_FORMAT=json (default) writes one JSON object per line, with any
+``extra=`` fields as keys; LOG_FORMAT=text writes plain lines.
+
+Per-stage latencies are recorded with ``span(stage, ship_id, family)`` into
+the ``bunkering_stage_seconds`` histogram and rendered in the Prometheus text
+format by ``metrics.render()``. Metrics are per process.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Logging
+_record_fields = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _record_fields:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT) -> None:
+    root = logging.getLogger("bunkering")
+    if root.handlers:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(level)
+    root.propagate = False
+
+def get_logger(name: str) -> logging.Logger:
+    configure_logging()
+    return logging.getLogger(f"bunkering.{name}")
+
+# Process memory
+def process_memory() -> Dict[str, int]:
+    """Resident memory of this process in bytes (Linux ``/proc``; empty elsewhere).
+
+    ``pss`` (proportional set size) charges shared pages, such as memory-mapped
+    table bundles or pages inherited from a preloading master, fractionally to
+    each process that maps them, so summing it over workers gives the
+    container's real footprint; ``private`` is what each extra worker adds.
+    """
+    memory: Dict[str, int] = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 3 and fields[2] == "kB":
+                    memory[fields[0].rstrip(":")] = int(fields[1]) * 1024
+    except OSError:
+        return memory
+    return {
+        "rss": memory.get("Rss", 0),
+        "pss": memory.get("Pss", 0),
+        "shared": memory.get("Shared_Clean", 0) + memory.get("Shared_Dirty", 0),
+        "private": memory.get("Private_Clean", 0) + memory.get("Private_Dirty", 0),
+    }
+
+# Metrics
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return ",".join(pairs)
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str], buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        # Per series: one count per bucket, then +Inf count, then sum
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            base = _label_text(self.labelnames, labels)
+            sep = "," if base else ""
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{le}"}} {int(cumulative)}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{base}}} {int(cumulative)}")
+        return lines
+
+class Gauges:
+    """Gauges read from a callback at scrape time, e.g. cache statistics."""
+
+    def __init__(self, name: str, help_text: str, collect: Callable[[], Dict[str, float]]):
+        self.name = name
+        self.help = help_text
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for key, value in sorted(self.collect().items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f'{self.name}{{key="{key}"}} {value}')
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+stage_seconds = metrics.register(Histogram(
+    "bunkering_stage_seconds",
+    "Time spent per calculation stage (table_load, interpolation, correction, vapour, response).",
+    ("stage", "ship", "family"),
+))
+request_seconds = metrics.register(Histogram(
+    "bunkering_request_seconds",
+    "HTTP request latency by route and status code.",
+    ("route", "method", "status"),
+))
+
+class span:
+    """``with span("interpolation", ship_id, family): ...`` records the block's duration."""
+
+    __slots__ = ("labels", "started")
+
+    def __init__(self, stage: str, ship_id: str = "", family: str = ""):
+        self.labels = (stage, ship_id, family)
+
+    def __enter__(self) -> "span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if METRICS_ENABLED:
+            stage_seconds.observe(time.perf_counter() - self.started, *self.labels)
@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""Offline bulk reconciliation: bunkering records in, calculated quantities out.
+
+    python api.py reconcile records.csv results.csv
+    python reconcile.py records.parquet results.parquet --workers 8
+
+Input is a CSV with the flattened tank columns of /bunkering/calculate/stream
+(``opening_tank1_level``, ...), or a Parquet file with the same columns.
+Records are sharded by ship across worker processes: each ship is pinned to
+one worker, so a worker only loads its own vessels' tables, and ships are
+spread over the workers by row count. Results keep the input order and the
+stream endpoint's CSV columns, one row per record (``status_code`` and
+``error`` say why a record failed), and are appended chunk by chunk.
+
+Progress is reported on stderr. After every chunk the position is saved in
+``<output>.checkpoint.json``; rerunning the same command after an
+interruption continues from the last written chunk, --restart starts over.
+Parquet output is a directory of part files, one per chunk, read back as one
+table by pandas or pyarrow. Parquet needs pyarrow, imported on first use.
+"""
+
+import argparse
+import csv
+import heapq
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from bunkering import BunkeringResponse, iter_bunkering_results, response_columns, unflatten_record
+
+RECONCILE_CHUNK_ROWS = int(os.getenv("RECONCILE_CHUNK_ROWS", "2000"))
+
+result_fields = list(BunkeringResponse.model_fields)
+
+# Input
+def format_of(path: str) -> str:
+    return "parquet" if path.lower().rstrip("/").endswith((".parquet", ".pq")) else "csv"
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("Parquet input/output needs pyarrow: pip install pyarrow")
+    return pyarrow
+
+def open_records(path: str, input_format: str) -> Tuple[List[str], Iterator[Sequence[Any]]]:
+    """Column names and an iterator of row values, in file order."""
+    if input_format == "parquet":
+        parquet = _pyarrow().parquet.ParquetFile(path)
+
+        def parquet_rows() -> Iterator[Sequence[Any]]:
+            for batch in parquet.iter_batches(batch_size=65536):
+                yield from zip(*(column.to_pylist() for column in batch.columns))
+
+        return list(parquet.schema_arrow.names), parquet_rows()
+
+    f = open(path, encoding="utf-8-sig", newline="")
+    reader = csv.reader(f)
+    columns = next(reader, [])
+
+    def csv_rows() -> Iterator[Sequence[Any]]:
+        with f:
+            yield from reader
+
+    return columns, csv_rows()
+
+def ship_column_of(columns: List[str], path: str) -> int:
+    if "ship_id" not in columns:
+        raise SystemExit(f"{path} has no ship_id column")
+    return columns.index("ship_id")
+
+def ship_counts(path: str, input_format: str) -> Counter:
+    if input_format == "parquet":
+        table = _pyarrow().parquet.read_table(path, columns=["ship_id"])
+        return Counter(table.column("ship_id").to_pylist())
+    columns, rows = open_records(path, input_format)
+    ship_column = ship_column_of(columns, path)
+    return Counter(row[ship_column] if ship_column < len(row) else "" for row in rows)
+
+def assign_ships(counts: Dict[Any, int], workers: int) -> Dict[Any, int]:
+    """Pin each ship to a worker: largest first, onto the least loaded one."""
+    load = [0] * workers
+    shards = {}
+    for ship_id, count in sorted(counts.items(), key=lambda item: (-item[1], str(item[0]))):
+        worker = load.index(min(load))
+        shards[ship_id] = worker
+        load[worker] += count
+    return shards
+
+# Worker side
+def reconcile_rows(columns: List[str], rows: List[Tuple[int, Sequence[Any]]], output_format: str) -> List[tuple]:
+    """Calculate one worker's share of a chunk; ``rows`` are (input index, values).
+
+    Returns (index, status_code, output row) per record. CSV rows come back
+    already formatted, so the coordinating process only has to write them.
+    """
+    records = (unflatten_record(dict(zip(columns, values))) for _, values in rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    results = []
+    for (index, _), item in zip(rows, iter_bunkering_results(records, chunk_rows=max(len(rows), 1))):
+        result = item.result.model_dump() if item.result is not None else {}
+        row = (index, item.status_code, item.error) + tuple(result.get(name) for name in result_fields)
+        if output_format == "csv":
+            writer.writerow(row)
+            row = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        results.append((index, item.status_code, row))
+    return results
+
+# Output
+class CsvOutput:
+    """One CSV file; the position is its size in bytes after the last chunk."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+
+    def open(self, position: Optional[int]) -> int:
+        if position is None:
+            self.file = open(self.path, "w", encoding="utf-8", newline="")
+            csv.writer(self.file).writerow(response_columns)
+            return self._sync()
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < position:
+            raise SystemExit(f"{self.path} is shorter than its checkpoint; rerun with --restart")
+        with open(self.path, "r+b") as f:
+            f.truncate(position)
+        self.file = open(self.path, "a", encoding="utf-8", newline="")
+        return position
+
+    def write(self, rows: List[tuple]) -> int:
+        self.file.write("".join(row[2] for row in rows))
+        return self._sync()
+
+    def _sync(self) -> int:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return os.fstat(self.file.fileno()).st_size
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+
+class ParquetOutput:
+    """A directory of part files, one per chunk; the position is the number of parts."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parts = 0
+        pyarrow = _pyarrow()
+        types = {"index": pyarrow.int64(), "status_code": pyarrow.int64(), "error": pyarrow.string()}
+        for name, field in BunkeringResponse.model_fields.items():
+            types[name] = pyarrow.string() if field.annotation is str else pyarrow.float64()
+        self.schema = pyarrow.schema([(name, types[name]) for name in response_columns])
+
+    def open(self, position: Optional[int]) -> int:
+        self.parts = position or 0
+        os.makedirs(self.path, exist_ok=True)
+        for name in os.listdir(self.path):
+            # Parts past the checkpoint were written after it was saved
+            if name.lstrip("_").startswith("part-") and (
+                position is None or int(name.lstrip("_").split(".")[0][5:]) >= self.parts
+            ):
+                os.remove(os.path.join(self.path, name))
+        return self.parts
+
+    def write(self, rows: List[tuple]) -> int:
+        pyarrow = _pyarrow()
+        columns = list(zip(*(row[2] for row in rows)))
+        table = pyarrow.Table.from_arrays(
+            [pyarrow.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema,
+        )
+        name = f"part-{self.parts:05d}.parquet"
+        # Readers skip "_" files, so a part being written is never read half done
+        pyarrow.parquet.write_table(table, os.path.join(self.path, "_" + name))
+        os.replace(os.path.join(self.path, "_" + name), os.path.join(self.path, name))
+        self.parts += 1
+        return self.parts
+
+    def close(self) -> None:
+        pass
+
+# Checkpoint
+def input_stamp(path: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {"input": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+class Progress:
+    def __init__(self, total: int, done: int, interval: float):
+        self.total = total
+        self.resumed_at = done
+        self.interval = interval
+        self.started = self.reported = time.perf_counter()
+
+    def report(self, done: int, failed: int, final: bool = False) -> None:
+        now = time.perf_counter()
+        if not final and now - self.reported < self.interval:
+            return
+        self.reported = now
+        elapsed = now - self.started
+        rate = (done - self.resumed_at) / elapsed if elapsed > 0 else 0.0
+        eta = f", ETA {(self.total - done) / rate:.0f}s" if rate > 0 and not final else ""
+        percent = 100.0 * done / self.total if self.total else 100.0
+        print(f"{done}/{self.total} rows ({percent:.1f}%), {rate:.0f} rows/s, {failed} failed{eta}",
+              file=sys.stderr, flush=True)
+
+def reconcile(
+    input_path: str,
+    output_path: str,
+    workers: int,
+    chunk_rows: int = RECONCILE_CHUNK_ROWS,
+    input_format: Optional[str] = None,
+    output_format: Optional[str] = None,
+    restart: bool = False,
+    progress_interval: float = 5.0,
+) -> Dict[str, Any]:
+    input_format = input_format or format_of(input_path)
+    output_format = output_format or format_of(output_path)
+    output = ParquetOutput(output_path) if output_format == "parquet" else CsvOutput(output_path)
+    checkpoint_path = output_path.rstrip("/") + ".checkpoint.json"
+    stamp = input_stamp(input_path)
+    state = None if restart else load_checkpoint(checkpoint_path)
+    if state is not None and state["input"] != stamp:
+        raise SystemExit(f"{input_path} changed since {checkpoint_path} was written; rerun with --restart")
+
+    counts = ship_counts(input_path, input_format)
+    total = sum(counts.values())
+    workers = max(min(workers, len(counts)), 1)
+    shards = assign_ships(counts, workers)
+    columns, rows = open_records(input_path, input_format)
+    ship_column = ship_column_of(columns, input_path)
+
+    done = state["rows"] if state else 0
+    failed = state["failed"] if state else 0
+    position = output.open(state["position"] if state else None)
+    if state is None:
+        save_checkpoint(checkpoint_path, {"input": stamp, "rows": 0, "failed": 0, "position": position})
+    progress = Progress(total, done, progress_interval)
+    if done:
+        print(f"resuming after {done} rows", file=sys.stderr)
+
+    pools = [ProcessPoolExecutor(max_workers=1) for _ in range(workers)]
+    pending: deque = deque()
+
+    def write_chunk() -> None:
+        nonlocal done, failed, position
+        futures = pending.popleft()
+        results = list(heapq.merge(*(future.result() for future in futures)))
+        position = output.write(results)
+        done += len(results)
+        failed += sum(1 for row in results if row[1] != 200)
+        save_checkpoint(checkpoint_path, {"input": stamp, "rows": done, "failed": failed, "position": position})
+        progress.report(done, failed)
+
+    try:
+        indexed = itertools.islice(enumerate(rows), done, None)
+        while True:
+            chunk = list(itertools.islice(indexed, chunk_rows))
+            if not chunk:
+                break
+            slices: Dict[int, List[Tuple[int, Sequence[Any]]]] = {}
+            for index, values in chunk:
+                ship_id = values[ship_column] if ship_column < len(values) else ""
+                slices.setdefault(shards[ship_id], []).append((index, values))
+            pending.append([pools[worker].submit(reconcile_rows, columns, part, output_format) for worker, part in slices.items()])
+            # Enough chunks in flight to keep every worker busy when the input is grouped by ship
+            if len(pending) >= 4 * workers:
+                write_chunk()
+        while pending:
+            write_chunk()
+    finally:
+        for pool in pools:
+            pool.shutdown(wait=not pending, cancel_futures=True)
+        output.close()
+
+    progress.report(done, failed, final=True)
+    os.remove(checkpoint_path)
+    return {"rows": done, "failed": failed, "workers": workers, "output": output_path}
+
+def default_workers() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Reconcile bunkering records offline across worker processes")
+    parser.add_argument("input", help="CSV or Parquet of bunkering records (flattened tank columns)")
+    parser.add_argument("output", help="Results CSV, or Parquet directory when it ends in .parquet")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="Worker processes (default: CPUs)")
+    parser.add_argument("--chunk-rows", type=int, default=RECONCILE_CHUNK_ROWS,
+                        help=f"Rows per chunk and checkpoint (default {RECONCILE_CHUNK_ROWS})")
+    parser.add_argument("--input-format", choices=["csv", "parquet"], help="Defaults from the file name")
+    parser.add_argument("--output-format", choices=["csv", "parquet"], help="Defaults from the file name")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="Seconds between progress lines")
+    args = parser.parse_args(argv)
+
+    try:
+        summary = reconcile(
+            args.input, args.output, args.workers, args.chunk_rows,
+            args.input_format, args.output_format, args.restart, args.progress_interval,
+        )
+    except KeyboardInterrupt:
+        print("interrupted; rerun the same command to resume", file=sys.stderr)
+        return 130
+    print(json.dumps(summary))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
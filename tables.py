@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""Calibration table loading and the precompiled binary table store.
+
+Each ``DATA/<ship>/`` directory can be compiled offline into a ``_compiled/``
+bundle of ``.npy`` files (row axis, column axis and value grid per table).
+The API memory-maps these bundles instead of parsing the wide CSVs, so the
+header-derived axes are extracted once and gunicorn workers share the same
+page-cache pages. Tables whose bundle is missing or older than the CSV fall
+back to pandas, which is imported only then.
+
+Every table version passes an integrity check once (``check_table``): axes
+numeric, finite and strictly increasing, the value grid shaped like its axes,
+no infinite values, with empty cells reported as warnings. Compiling stores
+the report and a content fingerprint in the bundle index; CSV loads look the
+report up by fingerprint, so unchanged content is not checked again.
+Tables with errors raise ``TableError`` when they load.
+
+    python tables.py                      # compile every ship in DATA/
+    python tables.py "MOUNT TAI" --dtype float32
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from observability import get_logger
+
+logger = get_logger("tables")
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+ship_dir = os.path.join(base_dir, "DATA")
+
+BUNDLE_DIR = "_compiled"
+BUNDLE_INDEX = "index.json"
+BUNDLE_VERSION = 2
+
+# 1-D tables: (row axis column, value column)
+curve_tables: Dict[str, tuple] = {
+    "volume_table": ("level", "volume"),
+    "tempcorr_table": ("Temp", "tcorr"),
+    "presscorr_table": ("Press", "pcorr"),
+}
+
+class Table:
+    """One calibration table: row axis ``x``, column axis ``y`` (2-D only) and values."""
+
+    __slots__ = ("name", "x", "y", "values")
+
+    def __init__(self, name: str, x: np.ndarray, y: Optional[np.ndarray], values: np.ndarray):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.values = values
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.x.nbytes + (self.y.nbytes if self.y is not None else 0) + self.values.nbytes)
+
+    @property
+    def mapped(self) -> bool:
+        """True when the grid is memory-mapped from a bundle (shared page cache), not private heap."""
+        return isinstance(self.values, np.memmap)
+
+def table_name_of(filename: str) -> str:
+    return filename.split("_table_")[0] + "_table"
+
+class TableError(ValueError):
+    """A calibration table that failed its integrity check."""
+
+def read_csv_table(path: str, name: Optional[str] = None) -> Table:
+    import pandas as pd  # only needed when a table has no compiled bundle
+
+    name = name or table_name_of(os.path.basename(path))
+    df = pd.read_csv(path, encoding="utf-8-sig")
+    # Normalise headers: stray BOMs and padding, and blank columns left by trailing commas
+    df.columns = [str(c).replace("\ufeff", "").strip() for c in df.columns]
+    df = df.drop(columns=[c for c in df.columns if c.startswith("Unnamed:") and df[c].isna().all()])
+    if name in curve_tables:
+        x_col, y_col = curve_tables[name]
+        missing = [c for c in (x_col, y_col) if c not in df.columns]
+        if missing:
+            raise TableError(f"no {' or '.join(missing)} column")
+        return Table(name, df[x_col].values, None, df[y_col].values)
+    if "level" not in df.columns:
+        raise TableError("no level column")
+    prefix = name.replace("_table", "_")
+    try:
+        y = np.array([float(c.replace(prefix, "")) for c in df.columns[1:]])
+    except ValueError:
+        headers = [c for c in df.columns[1:] if not _is_number(c.replace(prefix, ""))]
+        raise TableError(f"column header {headers[0]!r} is not a {prefix[:-1]} value")
+    return Table(name, df["level"].values, y, df.iloc[:, 1:].values)
+
+def _is_number(text: str) -> bool:
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+# Integrity checks
+def _axis_errors(label: str, axis: np.ndarray) -> List[str]:
+    if axis.ndim != 1 or len(axis) < 2:
+        return [f"{label} axis has {axis.size} points, needs at least 2"]
+    if axis.dtype.kind not in "iuf":
+        return [f"{label} axis is not numeric"]
+    missing = int((~np.isfinite(axis)).sum())
+    if missing:
+        return [f"{label} axis has {missing} empty or infinite values"]
+    descending = np.nonzero(np.diff(axis) <= 0)[0]
+    if len(descending):
+        row = int(descending[0]) + 1
+        more = f", and {len(descending) - 1} more" if len(descending) > 1 else ""
+        return [f"{label} axis is not strictly increasing: {axis[row - 1]:g} then {axis[row]:g} at row {row}{more}"]
+    return []
+
+def check_table(table: Table) -> Dict[str, Any]:
+    """Integrity report for one table; errors make it unusable, warnings do not."""
+    if table.y is None:
+        errors = _axis_errors(curve_tables.get(table.name, ("x",))[0], table.x)
+        expected: Tuple[int, ...] = (len(table.x),)
+    else:
+        errors = _axis_errors("level", table.x) + _axis_errors(table.name.replace("_table", ""), table.y)
+        expected = (len(table.x), len(table.y))
+    warnings: List[str] = []
+    values = table.values
+    if values.shape != expected:
+        errors.append(f"value grid is {list(values.shape)}, its axes give {list(expected)}")
+    elif values.dtype.kind not in "iuf":
+        errors.append("value grid has non-numeric cells")
+    else:
+        if np.isinf(values).any():
+            errors.append(f"value grid has {int(np.isinf(values).sum())} infinite cells")
+        empty = np.isnan(values)
+        if empty.any():
+            rows = np.unique(np.nonzero(empty)[0])
+            where = (
+                f"the row at level {table.x[rows[0]]:g}" if len(rows) == 1
+                else f"{len(rows)} rows, level {table.x[rows[0]]:g} to {table.x[rows[-1]]:g}"
+            )
+            warnings.append(f"{int(empty.sum())} empty cell(s) in {where}; readings there give no result")
+    return {"shape": list(values.shape), "errors": errors, "warnings": warnings}
+
+def fingerprint_of(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+def _check_csv(path: str, name: str) -> Tuple[Dict[str, Any], Optional[Table]]:
+    table = None
+    try:
+        table = read_csv_table(path, name)
+        report = check_table(table)
+    except TableError as e:
+        report = {"shape": None, "errors": [str(e)], "warnings": []}
+    except (ValueError, KeyError) as e:
+        # e.g. ragged rows or an empty file
+        report = {"shape": None, "errors": [f"unreadable: {e}"], "warnings": []}
+    return report, table
+
+def _source_stamp(path: str) -> Dict[str, int]:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def _read_index(bundle_dir: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(bundle_dir, BUNDLE_INDEX)) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get("version") != BUNDLE_VERSION:
+        return {}
+    return index.get("tables", {})
+
+def _bundle_entry(path: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Bundle file prefix and index entry for a CSV table; no entry when missing or stale."""
+    data_dir, filename = os.path.split(path)
+    stem = filename[:-len(".csv")]
+    bundle_dir = os.path.join(data_dir, BUNDLE_DIR)
+    entry = _read_index(bundle_dir).get(stem)
+    if entry is None or entry.get("source") != _source_stamp(path):
+        return "", None
+    return os.path.join(bundle_dir, stem), entry
+
+def stored_report(path: str) -> Optional[Dict[str, Any]]:
+    """The report a fresh bundle stored for a table at compile time; None means reading the CSV."""
+    _, entry = _bundle_entry(path)
+    return entry["report"] if entry is not None else None
+
+# Latest report per (file, table name) with the fingerprint it was made for, so a
+# table version is checked once and an edited file replaces its old report
+_reports: Dict[Tuple[str, str], Tuple[str, Dict[str, Any]]] = {}
+
+def inspect_table(path: str, name: Optional[str] = None, use_bundle: bool = True) -> Tuple[Dict[str, Any], Optional[Table]]:
+    """Integrity report of a table, plus the table itself when the CSV had to be read for it.
+
+    A fresh bundle carries the report made when it was compiled. Otherwise
+    the report is looked up by the CSV's content fingerprint and the table is
+    checked only the first time that content is seen.
+    """
+    name = name or table_name_of(os.path.basename(path))
+    if use_bundle:
+        _, entry = _bundle_entry(path)
+        if entry is not None:
+            return entry["report"], None
+    fingerprint = fingerprint_of(path)
+    cached = _reports.get((path, name))
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1], None
+    report, table = _check_csv(path, name)
+    report["fingerprint"] = fingerprint
+    _reports[(path, name)] = (fingerprint, report)
+    if report["errors"] or report["warnings"]:
+        logger.warning(
+            "Calibration table failed its integrity check" if report["errors"] else "Calibration table has warnings",
+            extra={"file": path, "errors": report["errors"], "warnings": report["warnings"]},
+        )
+    return report, table
+
+def load_table(path: str, name: Optional[str] = None, use_bundle: bool = True) -> Table:
+    """Load a table from its compiled bundle when fresh, else from the CSV.
+
+    Raises TableError when the table failed its integrity check.
+    """
+    name = name or table_name_of(os.path.basename(path))
+    report, table = inspect_table(path, name, use_bundle)
+    if report["errors"]:
+        raise TableError(f"{os.path.basename(path)}: " + "; ".join(report["errors"]))
+    if table is not None:
+        return table
+    if use_bundle:
+        prefix, entry = _bundle_entry(path)
+        if entry is not None:
+            x = np.load(f"{prefix}.x.npy", mmap_mode="r")
+            y = np.load(f"{prefix}.y.npy", mmap_mode="r") if entry.get("has_y") else None
+            values = np.load(f"{prefix}.z.npy", mmap_mode="r")
+            return Table(name, x, y, values)
+    return read_csv_table(path, name)
+
+def compile_ship(ship_id: str, dtype: str = "float64") -> Dict[str, Any]:
+    """Compile every CSV table of a ship into ``DATA/<ship>/_compiled``."""
+    data_dir = os.path.join(ship_dir, ship_id)
+    bundle_dir = os.path.join(data_dir, BUNDLE_DIR)
+    tmp_dir = tempfile.mkdtemp(prefix=".compiling-", dir=data_dir)
+    index: Dict[str, Any] = {}
+    try:
+        for filename in sorted(os.listdir(data_dir)):
+            path = os.path.join(data_dir, filename)
+            if not filename.endswith(".csv") or not os.path.isfile(path):
+                continue
+            stamp = _source_stamp(path)
+            name = table_name_of(filename)
+            stem = filename[:-len(".csv")]
+            report, table = _check_csv(path, name)
+            report["fingerprint"] = fingerprint_of(path)
+            if report["errors"]:
+                # Indexed without arrays, so loads fail with the report instead of reading the CSV
+                index[stem] = {"table": name, "source": stamp, "report": report}
+                continue
+            prefix = os.path.join(tmp_dir, stem)
+            # Axes stay float64; only the value grid honours --dtype
+            np.save(f"{prefix}.x.npy", np.ascontiguousarray(table.x, dtype=np.float64))
+            if table.y is not None:
+                np.save(f"{prefix}.y.npy", np.ascontiguousarray(table.y, dtype=np.float64))
+            np.save(f"{prefix}.z.npy", np.ascontiguousarray(table.values, dtype=dtype))
+            index[stem] = {
+                "table": table.name,
+                "has_y": table.y is not None,
+                "shape": list(table.values.shape),
+                "dtype": dtype,
+                "source": stamp,
+                "report": report,
+            }
+        with open(os.path.join(tmp_dir, BUNDLE_INDEX), "w") as f:
+            json.dump({"version": BUNDLE_VERSION, "ship_id": ship_id, "tables": index}, f, indent=1)
+
+        # Swap the finished bundle in so readers never see a partial one
+        old_dir = None
+        if os.path.exists(bundle_dir):
+            old_dir = bundle_dir + ".old"
+            shutil.rmtree(old_dir, ignore_errors=True)
+            os.rename(bundle_dir, old_dir)
+        os.rename(tmp_dir, bundle_dir)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return index
+
+def scan_tables(root: str = ship_dir) -> Dict[Tuple[str, str], Tuple[int, int]]:
+    """Return ``{(ship_id, filename): (mtime_ns, size)}`` for every CSV table under ``root``."""
+    stamps: Dict[Tuple[str, str], Tuple[int, int]] = {}
+    for ship_entry in os.scandir(root):
+        if not ship_entry.is_dir() or ship_entry.name.startswith((".", "_")):
+            continue
+        for entry in os.scandir(ship_entry.path):
+            if entry.name.endswith(".csv") and entry.is_file():
+                st = entry.stat()
+                stamps[(ship_entry.name, entry.name)] = (st.st_mtime_ns, st.st_size)
+    return stamps
+
+def tank_id_of(filename: str) -> str:
+    return filename[:-len(".csv")].split("_table_", 1)[1]
+
+def list_ships() -> List[str]:
+    return sorted(
+        d for d in os.listdir(ship_dir)
+        if os.path.isdir(os.path.join(ship_dir, d)) and not d.startswith((".", "_"))
+    )
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compile DATA/<ship> CSV tables into binary bundles")
+    parser.add_argument("ships", nargs="*", help="Ship IDs to compile (default: all)")
+    parser.add_argument("--dtype", choices=["float64", "float32"], default="float64",
+                        help="Storage type for value grids (float32 halves size, ~1e-7 relative error)")
+    args = parser.parse_args(argv)
+
+    for ship_id in args.ships or list_ships():
+        index = compile_ship(ship_id, args.dtype)
+        size = sum(
+            os.path.getsize(os.path.join(ship_dir, ship_id, BUNDLE_DIR, f))
+            for f in os.listdir(os.path.join(ship_dir, ship_id, BUNDLE_DIR))
+        )
+        print(f"{ship_id}: {len(index)} tables, {size / 1e6:.1f} MB")
+        for stem, entry in sorted(index.items()):
+            for problem in entry["report"]["errors"]:
+                print(f"  {stem}: ERROR {problem}")
+            for problem in entry["report"]["warnings"]:
+                print(f"  {stem}: warning {problem}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import json
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from engine import fleet, ship_dir, table_registry
+
+@pytest.fixture
+def edit_table(tmp_path):
+    """edit_table(ship_id, filename, transform) rewrites a DATA CSV; originals are restored afterwards.
+
+    The originals come back with their mtimes, so compiled bundles stay fresh,
+    and the edited ships are dropped from the shared table registry.
+    """
+    saved = []
+
+    def edit(ship_id: str, filename: str, transform) -> str:
+        path = os.path.join(ship_dir, ship_id, filename)
+        backup = str(tmp_path / f"{len(saved)}.csv")
+        if not any(p == path for p, _ in saved):
+            shutil.copy2(path, backup)
+            saved.append((path, backup))
+        with open(path, encoding="utf-8-sig") as f:
+            lines = f.read().splitlines()
+        with open(path, "w") as f:
+            f.write("\n".join(transform(lines)) + "\n")
+        # Distinct stamp even on coarse-mtime filesystems
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        return path
+
+    yield edit
+    for path, backup in reversed(saved):
+        shutil.copy2(backup, path)
+    table_registry.invalidate_ships([os.path.basename(os.path.dirname(path)) for path, _ in saved])
+
+@pytest.fixture
+def edit_manifest(tmp_path):
+    """edit_manifest(transform) rewrites DATA/fleet.json; the original is restored and reloaded afterwards."""
+    backup = str(tmp_path / "fleet.json")
+    shutil.copy2(fleet.path, backup)
+
+    def edit(transform) -> None:
+        with open(fleet.path) as f:
+            manifest = json.load(f)
+        with open(fleet.path, "w") as f:
+            json.dump(transform(manifest), f, indent=2)
+        st = os.stat(fleet.path)
+        os.utime(fleet.path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    yield edit
+    shutil.copy2(backup, fleet.path)
+    fleet.reload()
+
+def scale_column(factor: float, column: int = 1):
+    """A transform for edit_table multiplying one numeric column of every data row."""
+    def transform(lines):
+        rows = [lines[0]]
+        for line in lines[1:]:
+            cells = line.split(",")
+            cells[column] = repr(float(cells[column]) * factor)
+            rows.append(",".join(cells))
+        return rows
+    return transform
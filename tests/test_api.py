@@ -0,0 +1,225 @@
+import csv
+import io
+import json
+import pickle
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import bunkering
+from conftest import scale_column
+
+calculate_body = {
+    "ship_id": "CMA CGM MONACO",
+    "opening_tank1": {"level": 1000, "vapor_temp": -150, "liquid_temp": -160, "pressure": 0.22},
+    "opening_tank2": {"level": 980, "vapor_temp": -151, "liquid_temp": -158, "pressure": 0.20},
+    "closing_tank1": {"level": 1100, "vapor_temp": -149, "liquid_temp": -156, "pressure": 0.23},
+    "closing_tank2": {"level": 1085, "vapor_temp": -148, "liquid_temp": -155, "pressure": 0.24},
+    "opening_trim": 0.0, "opening_list": 0.0, "closing_trim": 0.0, "closing_list": 0.0,
+    "opening_time": "07/10/2025 10:00", "closing_time": "07/10/2025 16:00",
+    "density": 0.45, "bdn_quantity": 1000, "bog": 300,
+    "gross_energy": 10000, "unreckoned_qty": 0, "net_energy": 9800,
+}
+
+@pytest.fixture
+def client():
+    return TestClient(api.app)
+
+@pytest.fixture
+def process_executor(monkeypatch):
+    executor = api.CalculationExecutor(kind="process", workers=1)
+    monkeypatch.setattr(api, "calc_executor", executor)
+    yield executor
+    executor.shutdown()
+
+def test_process_executor_survives_error_results(client, process_executor):
+    invalid = dict(calculate_body, ship_id="NOPE")
+    response = client.post("/bunkering/calculate", json=invalid)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid ship ID"
+
+    response = client.post("/bunkering/calculate/batch", json=[invalid, calculate_body])
+    assert response.status_code == 200
+    assert [item["status_code"] for item in response.json()["results"]] == [400, 200]
+
+    response = client.post("/bunkering/calculate", json=dict(calculate_body, opening_time="07-10-2025"))
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid time format. Use MM/DD/YYYY HH:MM"}
+
+    response = client.post("/bunkering/calculate", json=calculate_body)
+    assert response.status_code == 200
+    assert response.json()["ship_id"] == "CMA CGM MONACO"
+
+def test_worker_errors_cross_as_calculation_error():
+    results = api._run_in_worker(api.table_registry.generation, bunkering.calculate_bunkering_many, [api.BunkeringRequest(**dict(calculate_body, ship_id="NOPE"))])
+    assert isinstance(pickle.loads(pickle.dumps(results))[0], bunkering.CalculationError)
+    with pytest.raises(bunkering.CalculationError) as raised:
+        api._run_in_worker(api.table_registry.generation, api.run_bunkering_calculation, api.BunkeringRequest(**dict(calculate_body, ship_id="NOPE")))
+    error = pickle.loads(pickle.dumps(raised.value))
+    assert (error.status_code, error.detail) == (400, "Invalid ship ID")
+
+def test_empty_fleet_inventory(client):
+    response = client.post("/fleet/inventory", json={"ships": []})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["ship_count"], body["tank_count"], body["failed"], body["total_volume"], body["ships"]) == (0, 0, 0, 0.0, [])
+
+def test_process_workers_follow_table_reloads(client, process_executor, edit_table):
+    watcher = api.DataWatcher(api.table_registry)
+    before = client.post("/bunkering/calculate", json=calculate_body).json()["tank1_volume_closing"]
+    edit_table("CMA CGM MONACO", "volume_table_LNG_TK1.csv", scale_column(1.1))
+    watcher.poll()
+    assert watcher.poll() == [("CMA CGM MONACO", "LNG_TK1")]
+    after = client.post("/bunkering/calculate", json=calculate_body).json()["tank1_volume_closing"]
+    assert after > before
+    assert after == api.run_bunkering_calculation(api.BunkeringRequest(**calculate_body)).tank1_volume_closing
+
+def test_live_session_keeps_its_tables_across_reloads(client, edit_table):
+    reading = {
+        "time": "2025-07-10T10:00:00", "list": 0.0, "trim": 0.0,
+        "tank1": {"level": 1000, "vapor_temp": -150, "liquid_temp": -160, "pressure": 0.22},
+        "tank2": {"level": 980, "vapor_temp": -151, "liquid_temp": -158, "pressure": 0.20},
+    }
+    with client.websocket_connect("/bunkering/live") as websocket:
+        websocket.send_json({"ship_id": "CMA CGM MONACO", "density": 0.45, "bog": 300})
+        assert websocket.receive_json()["type"] == "started"
+        websocket.send_json(reading)
+        opening = websocket.receive_json()
+        api.table_registry.get("CMA CGM MONACO", "LNG_TK1").load_all()
+        edit_table("CMA CGM MONACO", "volume_table_LNG_TK1.csv", scale_column(1.1))
+        assert api.table_registry.reload("CMA CGM MONACO", "LNG_TK1")
+        websocket.send_json(dict(reading, time="2025-07-10T11:00:00"))
+        later = websocket.receive_json()
+    assert later["tank1_volume"] == opening["tank1_volume"]
+    assert later["volume_difference"] == 0.0
+
+def test_fleet_inventory_reports_broken_tables(client, edit_table):
+    snapshot = {"ships": [{
+        "ship_id": "MOUNT TAI", "trim": 0.0, "list": 0.0, "density": 0.45,
+        "tanks": [{"tank_id": "LNG_TK1", "level": 5000, "vapor_temp": -150, "liquid_temp": -160, "pressure": 0.2}],
+    }]}
+    edit_table("MOUNT TAI", "temp_table_LNG_TK1.csv", lambda lines: lines[:-5])
+    api.table_registry.invalidate_ships(["MOUNT TAI"])
+    response = client.post("/fleet/inventory", json=snapshot)
+    assert response.status_code == 500
+    assert "temp_table_LNG_TK1.csv: 1127 level rows, the volume table has 1132" in response.json()["detail"]
+
+def test_metadata_conditional_requests(client, edit_manifest):
+    first = client.get("/ships")
+    assert first.status_code == 200
+    etag, last_modified = first.headers["etag"], first.headers["last-modified"]
+    assert client.get("/ships", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/ships", headers={"If-None-Match": f'W/{etag}, "other"'}).status_code == 304
+    assert client.get("/ships", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/ships", headers={"If-None-Match": '"other"'}).status_code == 200
+    ship = client.get("/ships/CMA CGM MONACO")
+    assert client.get("/ships/CMA CGM MONACO", headers={"If-None-Match": ship.headers["etag"]}).status_code == 304
+
+    def drop_ship(manifest):
+        del manifest["ships"]["CMA CGM ARCTIC"]
+        return manifest
+
+    edit_manifest(drop_ship)
+    assert client.post("/fleet/reload").json()["changed"] == ["CMA CGM ARCTIC"]
+    changed = client.get("/ships", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert "CMA CGM ARCTIC" not in changed.json()["ships"]
+
+def test_inverse_round_trips_through_calculate(client):
+    conditions = {
+        slot: {k: v for k, v in calculate_body[slot].items() if k != "level"}
+        for slot in ("closing_tank1", "closing_tank2")
+    }
+    inverse = dict(
+        {k: calculate_body[k] for k in (
+            "ship_id", "opening_tank1", "opening_tank2", "opening_trim", "opening_list", "closing_trim",
+            "closing_list", "opening_time", "closing_time", "density", "bog", "unreckoned_qty",
+        )},
+        target_quantity=1500.0,
+        **conditions,
+    )
+    response = client.post("/bunkering/inverse", json=inverse)
+    assert response.status_code == 200
+    solved = response.json()
+    assert solved["achieved_quantity"] == pytest.approx(1500.0, abs=0.1)
+
+    closing = {
+        slot: dict(conditions[slot], level=tank["closing_level"])
+        for slot, tank in zip(("closing_tank1", "closing_tank2"), solved["tanks"])
+    }
+    calculated = client.post("/bunkering/calculate", json=dict(calculate_body, **closing)).json()
+    assert calculated["loaded_quantity"] == solved["achieved_quantity"]
+    assert calculated["closing_quantity"] == solved["closing_quantity"]
+
+    response = client.post("/bunkering/inverse", json=dict(inverse, target_quantity=1e9))
+    assert response.status_code == 422
+
+def test_seeded_uncertainty_is_stable(client):
+    request = dict(
+        calculate_body, samples=2000, seed=7,
+        tolerances={"level": 5, "vapor_temp": 0.5, "liquid_temp": 0.3, "pressure": 0.005, "density": 0.002},
+    )
+    first = client.post("/bunkering/calculate/uncertainty", json=request).json()
+    second = client.post("/bunkering/calculate/uncertainty", json=request).json()
+    assert first["loaded_quantity"] == second["loaded_quantity"]
+    assert first["difference"] == second["difference"]
+
+    interval = first["loaded_quantity"]
+    nominal = client.post("/bunkering/calculate", json=calculate_body).json()["loaded_quantity"]
+    assert interval["nominal"] == nominal
+    assert interval["low"] < nominal < interval["high"]
+
+    other = client.post("/bunkering/calculate/uncertainty", json=dict(request, seed=8)).json()["loaded_quantity"]
+    assert other != interval
+    assert other["std"] == pytest.approx(interval["std"], rel=0.15)
+
+    exact = client.post("/bunkering/calculate/uncertainty", json=dict(request, tolerances={})).json()["loaded_quantity"]
+    assert exact["low"] == exact["high"] == pytest.approx(nominal, abs=0.005)
+
+def flat_row(body):
+    row = {k: v for k, v in body.items() if not isinstance(v, dict)}
+    for slot in ("opening_tank1", "opening_tank2", "closing_tank1", "closing_tank2"):
+        row.update({f"{slot}_{field}": value for field, value in body[slot].items()})
+    return row
+
+def test_stream_ndjson_keeps_order_and_reports_rows(client):
+    lines = [
+        json.dumps(calculate_body),
+        "{not json",
+        json.dumps(dict(calculate_body, ship_id="NOPE")),
+        json.dumps({"ship_id": "CMA CGM MONACO"}),
+        "",
+        json.dumps(calculate_body),
+    ]
+    response = client.post(
+        "/bunkering/calculate/stream", files={"file": ("ops.ndjson", "\n".join(lines).encode())}
+    )
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert [r["status_code"] for r in results] == [200, 422, 400, 422, 200]
+    assert results[1]["error"].startswith("Invalid JSON")
+    expected = client.post("/bunkering/calculate", json=calculate_body).json()
+    assert results[0]["result"]["loaded_quantity"] == expected["loaded_quantity"]
+
+def test_stream_csv_in_and_out(client):
+    rows = [flat_row(calculate_body), flat_row(dict(calculate_body, opening_time="bad"))]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    response = client.post(
+        "/bunkering/calculate/stream",
+        params={"output_format": "csv"},
+        files={"file": ("ops.csv", ("﻿" + buffer.getvalue()).encode())},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    results = list(csv.DictReader(io.StringIO(response.text)))
+    assert list(results[0]) == bunkering.response_columns
+    assert [(r["index"], r["status_code"]) for r in results] == [("0", "200"), ("1", "400")]
+    assert results[1]["error"] == "Invalid time format. Use MM/DD/YYYY HH:MM"
+    expected = client.post("/bunkering/calculate", json=calculate_body).json()
+    assert float(results[0]["loaded_quantity"]) == expected["loaded_quantity"]
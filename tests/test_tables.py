@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+import tables
+from engine import TankTables
+
+def test_edited_table_replaces_its_report(tmp_path):
+    path = str(tmp_path / "presscorr_table_LNG_TK.csv")
+    for version in range(5):
+        with open(path, "w") as f:
+            f.write("Press,pcorr\n" + "".join(f"{p},{1 + version / 100}\n" for p in range(10)))
+        report, _ = tables.inspect_table(path, use_bundle=False)
+        assert report["errors"] == []
+        assert tables.inspect_table(path, use_bundle=False)[0] is report
+    assert [key for key in tables._reports if key[0] == path] == [(path, tables.table_name_of(os.path.basename(path)))]
+
+def test_csv_only_tank_loads_and_checks_lazily(edit_table):
+    tank = TankTables("MOUNT TAI", "LNG_TK1", use_bundles=False)
+    assert tank.tables == {}
+    tank.list_interpolator
+    assert sorted(tank.tables) == ["list_table", "volume_table"]
+
+    edit_table("MOUNT TAI", "temp_table_LNG_TK1.csv", lambda lines: lines[:-5])
+    tank = TankTables("MOUNT TAI", "LNG_TK1")
+    tank.list_interpolator
+    with pytest.raises(tables.TableError, match="level rows, the volume table has"):
+        tank.temp_interpolator
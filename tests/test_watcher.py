@@ -0,0 +1,59 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from conftest import scale_column
+from engine import Vessel
+
+@pytest.fixture
+def registry():
+    registry = api.TableRegistry()
+    registry.get("MOUNT TAI", "LNG_TK1").load_all()
+    return registry
+
+def test_hot_swap_replaces_tables_and_drops_their_results(registry, edit_table):
+    watcher = api.DataWatcher(registry)
+    tank = Vessel("MOUNT TAI", registry=registry).tanks[0]
+    reading = (5000.0, 0.0, 0.0, -150.0, 0.2)
+    _, before = tank.correct(*reading)
+    assert registry.results.stats()["size"] == 1
+
+    edit_table("MOUNT TAI", "volume_table_LNG_TK1.csv", scale_column(1.1))
+    assert watcher.poll() == []
+    assert watcher.poll() == [("MOUNT TAI", "LNG_TK1")]
+    assert registry.results.stats()["size"] == 0
+    swapped = registry.get("MOUNT TAI", "LNG_TK1")
+    _, after = tank.correct(*reading)
+    assert after == pytest.approx(before * 1.1, abs=0.02)
+
+    # A replacement that fails validation leaves the swapped-in tables serving
+    edit_table("MOUNT TAI", "temp_table_LNG_TK1.csv", lambda lines: lines[:-5])
+    watcher.poll()
+    assert watcher.poll() == []
+    assert registry.get("MOUNT TAI", "LNG_TK1") is swapped
+    assert tank.correct(*reading)[1] == after
+
+def test_failed_reload_is_not_retried_until_the_file_changes(registry, edit_table, monkeypatch):
+    watcher = api.DataWatcher(registry)
+    calls = []
+    reload = registry.reload
+    monkeypatch.setattr(registry, "reload", lambda *key: calls.append(key) or reload(*key))
+    edit_table("MOUNT TAI", "temp_table_LNG_TK1.csv", lambda lines: lines[:-5])
+    watcher.poll()
+    assert watcher.poll() == []
+    assert calls == [("MOUNT TAI", "LNG_TK1")]
+    assert watcher.last_failure["files"] == ["temp_table_LNG_TK1.csv"]
+    assert "level rows" in watcher.last_failure["error"]
+    watcher.poll()
+    watcher.poll()
+    assert len(calls) == 1
+
+    monkeypatch.setattr(api, "data_watcher", watcher)
+    report = TestClient(api.app).get("/health/ready").json()["data_watcher"]
+    assert report["failing"] == ["MOUNT TAI LNG_TK1"]
+    assert report["last_failure"]["tank_id"] == "LNG_TK1"
+
+    edit_table("MOUNT TAI", "temp_table_LNG_TK1.csv", lambda lines: lines)
+    watcher.poll()
+    watcher.poll()
+    assert len(calls) == 2